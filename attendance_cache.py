@@ -0,0 +1,139 @@
+"""แคชข้อมูลที่ประมวลผลแล้วร่วมกันทั้ง process (ไม่มีการเรียก Streamlit)
+
+st.cache_data คืนสำเนาที่ unpickle ใหม่ให้ทุก session ทุก rerun หน่วยความจำจึงโตตามจำนวนผู้ใช้
+แคชนี้เก็บผลลัพธ์ชุดเดียวต่อเวอร์ชันของข้อมูล ทุก session อ้างอิงอ็อบเจกต์เดียวกันโดยไม่ copy
+และจำกัดขนาดรวมตามงบหน่วยความจำ: เวอร์ชันที่ไม่ได้ใช้นานที่สุดจะถูกลบก่อน (LRU)
+
+ผลลัพธ์ย่อยของแต่ละชุดนำเข้า (batch_key) เก็บในแคชเดียวกัน จึงนับรวมในงบและถูกลบได้เช่นกัน
+
+ผลลัพธ์ในแคชถือเป็นข้อมูลอ่านอย่างเดียว ห้ามแก้ไขในที่ (inplace)
+แอปที่ใช้แคชนี้ต้องเปิด Copy-on-Write ของ pandas (ncswtss.py เรียก enable_copy_on_write ตอนเริ่ม)
+การกรอง/เพิ่มคอลัมน์ในผลลัพธ์จึงสร้างอ็อบเจกต์ใหม่โดยไม่กระทบของที่แชร์
+"""
+import collections
+import datetime
+import threading
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_BUDGET_MB = 1024
+
+
+def enable_copy_on_write():
+    """เปิด Copy-on-Write ของ pandas ทั้ง process (pandas 3 เปิดเสมอ รุ่นก่อนหน้าต้องเปิดเอง)
+
+    ให้แอปเรียกเองครั้งเดียวตอนเริ่ม การ import โมดูลนี้ไม่เปลี่ยนค่าตั้งของ pandas
+    """
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+
+def estimate_bytes(value):
+    """ประมาณขนาดในหน่วยความจำของผลลัพธ์ (DataFrame, numpy array และ tuple/list/dict ที่ซ้อนกัน)"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(estimate_bytes(item) for item in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_bytes(item) for item in value)
+    return 0
+
+
+class SharedDatasetCache:
+    """แคช key -> ผลลัพธ์ ที่ใช้ร่วมกันทุก session จำกัดขนาดรวมด้วย budget_bytes (LRU)"""
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_MB * 2**20):
+        self.budget_bytes = budget_bytes
+        self._entries = collections.OrderedDict()  # เรียงจากใช้ล่าสุดน้อยที่สุด -> มากที่สุด
+        self._lock = threading.Lock()
+        self._build_lock = threading.RLock()  # build() อาจเรียก get_or_build ของผลลัพธ์ย่อยซ้อนกัน
+        self.evictions = 0
+
+    def get(self, key):
+        """คืนผลลัพธ์ของ key (และเลื่อนเป็นรายการที่ใช้ล่าสุด) หรือ None ถ้าไม่มี"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            entry["hits"] += 1
+            entry["last_used"] = datetime.datetime.now()
+            return entry["value"]
+
+    def get_or_build(self, key, build):
+        """คืนผลลัพธ์ของ key ถ้าไม่มีให้เรียก build() สร้างเพียงครั้งเดียว แม้หลาย session ขอพร้อมกัน"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._build_lock:
+            # session อื่นอาจสร้างเสร็จระหว่างรอ lock
+            value = self.get(key)
+            if value is None:
+                value = build()
+                self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        size = estimate_bytes(value)
+        now = datetime.datetime.now()
+        with self._lock:
+            self._entries[key] = {"value": value, "bytes": size, "hits": 0, "created": now, "last_used": now}
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        # ไม่ลบรายการล่าสุด แม้จะใหญ่เกินงบเอง (แดชบอร์ดต้องมีข้อมูลอย่างน้อยหนึ่งชุด)
+        while len(self._entries) > 1 and self.total_bytes() > self.budget_bytes:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def total_bytes(self):
+        return sum(entry["bytes"] for entry in self._entries.values())
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def report(self):
+        """ตารางขนาดของแต่ละเวอร์ชันในแคช (ใช้ล่าสุดก่อน)"""
+        with self._lock:
+            rows = [
+                {
+                    "version": describe_key(key),
+                    "MB": entry["bytes"] / 2**20,
+                    "hits": entry["hits"],
+                    "created": entry["created"].isoformat(timespec="seconds"),
+                    "last_used": entry["last_used"].isoformat(timespec="seconds"),
+                }
+                for key, entry in reversed(self._entries.items())
+            ]
+        return pd.DataFrame(rows, columns=["version", "MB", "hits", "created", "last_used"])
+
+
+def batch_key(batch):
+    """key ของผลลัพธ์ย่อยต่อชุดนำเข้า (แยกจาก key ลายเซ็นของที่เก็บทั้งชุด)"""
+    return ("batch", batch)
+
+
+def describe_key(key):
+    """ชื่อสั้นของ key สำหรับแสดงผล (ลายเซ็นของที่เก็บยาวเกินจะแสดงทั้งหมด)"""
+    if isinstance(key, tuple) and key and key[0] == "batch":
+        return f"batch {len(key[1])} parts #{hash(key) & 0xFFFFFF:06x}"
+    if isinstance(key, tuple):
+        return f"{len(key)} parts #{hash(key) & 0xFFFFFF:06x}"
+    return str(key)
@@ -0,0 +1,120 @@
+"""สร้างสเปกกราฟ Altair จากยอดรวมที่สรุปไว้แล้ว (ไม่มีการเรียก Streamlit)
+
+ข้อมูลของกราฟมาจาก cube/summary เสมอ ไม่ใช่ข้อมูลรายแถว
+ขนาดของสเปกจึงขึ้นกับจำนวนประเภท/เดือน/แผนก ไม่ขึ้นกับจำนวนแถวดิบ
+ทุกฟังก์ชันคืนสเปก Vega-Lite เป็น dict (ส่งให้ st.vega_lite_chart และ cache ได้)
+"""
+import altair as alt
+import pandas as pd
+
+import attendance_pipeline
+
+LEAVE_COLORS = {
+    "ลาป่วย/ลากิจ": "#06BD1699",
+    "ขาด": "#C40FE9",
+    "สาย": "#0BCBEC",
+}
+
+TREND_TYPES = ["สาย", "ขาด"]  # กราฟแนวโน้มรายเดือนต่อแผนก
+
+THAI_MONTHS_SHORT = [
+    "ม.ค.", "ก.พ.", "มี.ค.", "เม.ย.", "พ.ค.", "มิ.ย.",
+    "ก.ค.", "ส.ค.", "ก.ย.", "ต.ค.", "พ.ย.", "ธ.ค.",
+]
+
+
+def _color_scale():
+    return alt.Scale(domain=list(LEAVE_COLORS), range=list(LEAVE_COLORS.values()))
+
+
+# ----------------------------------------------------------------------------------
+# Pie Chart สัดส่วนประเภทการลา
+# ----------------------------------------------------------------------------------
+def leave_totals(frame):
+    """ยอดรวมต่อประเภท (เฉพาะที่มากกว่า 0) พร้อมเปอร์เซ็นต์และข้อความกำกับ (ไม่วนทีละแถว)
+
+    frame เป็นได้ทั้ง cube หรือ summary (ใช้เฉพาะคอลัมน์ยอดการลา)
+    """
+    totals = frame[attendance_pipeline.LEAVE_TYPES].sum().astype("float64").reset_index()
+    totals.columns = ["ประเภท", "ยอดรวม"]
+    totals = totals[totals["ยอดรวม"] > 0].reset_index(drop=True)
+    totals["Percentage"] = (totals["ยอดรวม"] / totals["ยอดรวม"].sum() * 100).round(1)
+    totals["label"] = totals["ประเภท"] + " (" + totals["Percentage"].astype(str) + "%)"
+    return totals
+
+
+def pie_chart_spec(totals):
+    """สเปก Pie Chart (วงแหวน + ข้อความกำกับ + ข้อความกลาง) จากผลของ leave_totals"""
+    base = alt.Chart(totals).encode(
+        theta=alt.Theta("ยอดรวม", stack=True),
+        color=alt.Color("ประเภท", scale=_color_scale()),
+        order=alt.Order("ยอดรวม", sort="descending"),
+        tooltip=[
+            "ประเภท",
+            alt.Tooltip("ยอดรวม", format=".1f", title="จำนวน (วัน/ครั้ง)"),
+            alt.Tooltip("Percentage", format=".1f", title="เปอร์เซ็นต์ (%)"),
+        ],
+    )
+
+    pie = base.mark_arc(outerRadius=130, innerRadius=60)
+
+    text_labels = base.mark_text(
+        radius=230,
+        size=20,
+        fontWeight="bold",
+    ).encode(
+        text=alt.Text("label:N"),
+        color=alt.Color("ประเภท:N", scale=_color_scale()),
+        tooltip=alt.value(None),
+    )
+
+    center_text = alt.Chart(pd.DataFrame({"text": ["รวม 100%"]})).mark_text(
+        size=20, color="black", fontWeight="bold"
+    ).encode(text="text:N")
+
+    chart = (pie + text_labels + center_text).properties(
+        width=500,
+        height=500,
+    ).configure_legend(
+        titleFontSize=14,
+        labelFontSize=12,
+    )
+    return chart.to_dict()
+
+
+# ----------------------------------------------------------------------------------
+# แนวโน้มรายเดือนต่อแผนก
+# ----------------------------------------------------------------------------------
+def month_label(months):
+    """Period รายเดือน -> "ม.ค. 68" (ปี พ.ศ. สองหลัก)"""
+    names = pd.Series(THAI_MONTHS_SHORT).to_numpy()[months.dt.month.to_numpy() - 1]
+    years = ((months.dt.year + 543) % 100).astype(str).str.zfill(2)
+    return names + " " + years
+
+
+def department_trend(cube, leave_types=TREND_TYPES):
+    """ยอดรวมต่อ (เดือน, แผนก, ประเภท) ในรูปแบบยาว สำหรับกราฟเส้น"""
+    if cube.empty:
+        return pd.DataFrame(columns=["เดือน", "แผนก", "ประเภท", "ยอดรวม"])
+    monthly = attendance_pipeline.sum_leaves(cube, ["เดือน", "แผนก"])
+    trend = monthly.melt(
+        id_vars=["เดือน", "แผนก"], value_vars=leave_types, var_name="ประเภท", value_name="ยอดรวม"
+    )
+    trend["ยอดรวม"] = trend["ยอดรวม"].astype("float64")
+    return trend.sort_values(["ประเภท", "เดือน"], kind="stable").reset_index(drop=True)
+
+
+def trend_chart_spec(trend, leave):
+    """สเปกกราฟเส้นรายเดือนของประเภท leave แยกสีตามแผนก"""
+    data = trend.loc[trend["ประเภท"] == leave, ["เดือน", "แผนก", "ยอดรวม"]]
+    order = list(dict.fromkeys(month_label(data["เดือน"].sort_values())))
+    data = data.assign(เดือน=month_label(data["เดือน"]), แผนก=data["แผนก"].astype(str))
+    unit = "ครั้ง" if leave == "สาย" else "วัน"
+
+    chart = alt.Chart(data).mark_line(point=True).encode(
+        x=alt.X("เดือน:O", sort=order, title=None),
+        y=alt.Y("ยอดรวม:Q", title=f"{leave} ({unit})"),
+        color=alt.Color("แผนก:N", title="แผนก"),
+        tooltip=["เดือน", "แผนก", alt.Tooltip("ยอดรวม", format=".1f", title=f"จำนวน ({unit})")],
+    ).properties(height=320)
+    return chart.to_dict()
@@ -0,0 +1,126 @@
+"""คำสั่งประมวลผลข้อมูลการลงเวลาแบบไม่ต้องเปิด Streamlit
+
+ตัวอย่าง:
+    python attendance_cli.py import attendances.xlsx
+    python attendance_cli.py import branches/ "exports/*/2568-*.xlsx" --workers 4
+    python attendance_cli.py build
+    python attendance_cli.py profile
+    python attendance_cli.py parity
+
+`build` นำเข้าไฟล์ต้นทางที่เปลี่ยน ประมวลผลทั้งชุด แล้วเขียน summary/cube/แถวการลา
+ลงโฟลเดอร์ artifacts ให้แดชบอร์ดอ่านได้ทันทีตอนเริ่ม (เหมาะกับการตั้ง cron ทุกคืน)
+
+`profile` สรุปเวลาแต่ละขั้นของแดชบอร์ดจากไฟล์ log ที่ทุก session บันทึกไว้
+`parity` ตรวจว่าโหมด lazy (query บนที่เก็บ) ให้ผลตรงกับการประมวลผลในหน่วยความจำ
+"""
+import argparse
+import os
+import sys
+import time
+
+import attendance_pipeline
+import attendance_profiling
+import attendance_query
+import attendance_store
+
+
+def cmd_import(args):
+    file_paths = attendance_store.expand_sources(args.files)
+    if not file_paths:
+        print("ไม่พบไฟล์ต้นทาง (.xlsx / .parquet)", file=sys.stderr)
+        return 1
+    results = attendance_store.import_files(file_paths, args.store, force=args.force, max_workers=args.workers)
+    errors = attendance_store.import_errors(args.store)
+    for file_path, rows_added in results.items():
+        if rows_added is None:
+            print(f"{file_path}: นำเข้าไม่สำเร็จ ({errors.get(os.path.abspath(file_path), 'ไม่ทราบสาเหตุ')})", file=sys.stderr)
+        else:
+            print(f"{file_path}: เพิ่ม {rows_added:,} แถว")
+    return 1 if None in results.values() else 0
+
+
+def report_import_errors(store_path):
+    """แจ้งไฟล์ต้นทางที่นำเข้าไม่ได้ (ไฟล์อื่นยังนำเข้าตามปกติ)"""
+    for file_path, error in attendance_store.import_errors(store_path).items():
+        print(f"ข้ามไฟล์ที่นำเข้าไม่ได้ {file_path}: {error}", file=sys.stderr)
+
+
+def cmd_build(args):
+    start = time.perf_counter()
+    signature = attendance_pipeline.sync_sources(args.sources, args.store, force=args.force, max_workers=args.workers)
+    report_import_errors(args.store)
+    if not signature:
+        print("ไม่พบข้อมูลในที่เก็บ (ตรวจสอบไฟล์ต้นทาง)", file=sys.stderr)
+        return 1
+
+    outputs = attendance_pipeline.process_store(args.store)
+    manifest = attendance_pipeline.write_artifacts(outputs, signature, args.out)
+    rows = ", ".join(f"{name} {count:,} แถว" for name, count in manifest["rows"].items())
+    print(f"เขียนผลลัพธ์ที่ {args.out}: {rows} ({time.perf_counter() - start:.2f} วินาที)")
+    return 0
+
+
+def cmd_profile(args):
+    try:
+        stages = attendance_profiling.read_log(args.log)
+    except FileNotFoundError:
+        print(f"ไม่พบไฟล์ log: {args.log}", file=sys.stderr)
+        return 1
+    if stages.empty:
+        print("ยังไม่มีข้อมูลการจับเวลาในไฟล์ log")
+        return 0
+
+    print(f"{stages['run_id'].nunique():,} rerun จาก {stages['session_id'].nunique():,} session")
+    print(attendance_profiling.summarize_log(stages).to_string(index=False, float_format="{:.4f}".format))
+    return 0
+
+
+def cmd_parity(args):
+    start = time.perf_counter()
+    mismatches = attendance_query.check_parity(args.store, samples=args.samples)
+    for line in mismatches:
+        print(f"MISMATCH {line}")
+    if mismatches:
+        print(f"โหมด lazy ไม่ตรงกับโหมดในหน่วยความจำ {len(mismatches):,} จุด", file=sys.stderr)
+        return 1
+    print(f"โหมด lazy ตรงกับโหมดในหน่วยความจำ ({time.perf_counter() - start:.2f} วินาที)")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="ประมวลผลข้อมูลการลงเวลา (ไม่ต้องเปิดแดชบอร์ด)")
+    parser.add_argument("--store", default=attendance_store.STORE_PATH, help="โฟลเดอร์ที่เก็บ Parquet")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="นำเข้าไฟล์ Excel/Parquet เข้าสู่ที่เก็บ")
+    import_parser.add_argument("files", nargs="+", help="ไฟล์, โฟลเดอร์ หรือ glob")
+    import_parser.add_argument("--force", action="store_true", help="อ่านไฟล์ใหม่แม้ไม่เปลี่ยน")
+    import_parser.add_argument("--workers", type=int, default=None, help="จำนวน process ที่ใช้แปลงไฟล์ (ค่าเริ่มต้นเท่าจำนวน CPU)")
+    import_parser.set_defaults(func=cmd_import)
+
+    build_parser = subparsers.add_parser("build", help="ประมวลผลและเขียนผลลัพธ์ล่วงหน้าให้แดชบอร์ด")
+    build_parser.add_argument(
+        "--sources", nargs="+", default=attendance_pipeline.DEFAULT_SOURCES, help="ไฟล์, โฟลเดอร์ หรือ glob"
+    )
+    build_parser.add_argument("--out", default=attendance_pipeline.ARTIFACTS_PATH)
+    build_parser.add_argument("--force", action="store_true", help="อ่านไฟล์ต้นทางใหม่แม้ไม่เปลี่ยน")
+    build_parser.add_argument("--workers", type=int, default=None, help="จำนวน process ที่ใช้แปลงไฟล์ (ค่าเริ่มต้นเท่าจำนวน CPU)")
+    build_parser.set_defaults(func=cmd_build)
+
+    profile_parser = subparsers.add_parser("profile", help="สรุปเวลาแต่ละขั้นของแดชบอร์ดจากไฟล์ log")
+    profile_parser.add_argument("--log", default=attendance_profiling.PROFILE_LOG_PATH)
+    profile_parser.set_defaults(func=cmd_profile)
+
+    parity_parser = subparsers.add_parser("parity", help="เทียบผลโหมด lazy กับโหมดในหน่วยความจำ")
+    parity_parser.add_argument("--samples", type=int, default=3, help="จำนวนปี/แผนก/พนักงานตัวอย่างที่ใช้ตรวจ")
+    parity_parser.set_defaults(func=cmd_parity)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""ขั้นประมวลผลข้อมูลการลงเวลา (ไม่มีการเรียก Streamlit ใช้ได้ทั้งจากแดชบอร์ดและ CLI)
+
+ทุกขั้นทำงานแบบทั้งคอลัมน์ (vectorized): ค่าข้อความ/เวลาจะถูกแปลงเฉพาะค่าที่ไม่ซ้ำกัน
+แล้วกระจายกลับด้วยรหัส และคำนวณน้ำหนักการลาจากตาราง lookup
+"""
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import attendance_store
+
+# ----------------------------------------------------------------------------------
+# ประเภทการลาและตารางน้ำหนัก
+# ----------------------------------------------------------------------------------
+LEAVE_TYPES = ["ลาป่วย/ลากิจ", "ขาด", "สาย"]
+
+# ข้อยกเว้น -> (ประเภทการลา, น้ำหนัก) ข้อยกเว้นอื่นทั้งหมดมีน้ำหนักเป็น 0
+LEAVE_EXCEPTIONS = {
+    "ลาป่วย": ("ลาป่วย/ลากิจ", 1.0),
+    "ลากิจ": ("ลาป่วย/ลากิจ", 1.0),
+    "ลาป่วยครึ่งวัน": ("ลาป่วย/ลากิจ", 0.5),
+    "ลากิจครึ่งวัน": ("ลาป่วย/ลากิจ", 0.5),
+    "ขาด": ("ขาด", 1.0),
+    "ขาดครึ่งวัน": ("ขาด", 0.5),
+    "สาย": ("สาย", 1.0),
+}
+
+LEAVE_WEIGHTS = pd.DataFrame(0.0, index=list(LEAVE_EXCEPTIONS), columns=LEAVE_TYPES)
+for _exception, (_leave, _weight) in LEAVE_EXCEPTIONS.items():
+    LEAVE_WEIGHTS.loc[_exception, _leave] = _weight
+
+TIME_FORMATS = ["%H:%M:%S", "%H:%M"]
+
+# --- โครงสร้างข้อมูลแบบกะทัดรัดหลังประมวลผล ---
+# ข้อความที่ซ้ำกันมากเก็บเป็น categorical, เวลาเก็บเป็นนาทีนับจากเที่ยงคืน (int16)
+CATEGORY_COLUMNS = ["ชื่อ-สกุล", "แผนก", "ข้อยกเว้น"]
+MISSING_TIME = -1  # เวลาที่ว่าง/อ่านไม่ได้
+ROW_WEIGHT_DTYPE = "float32"  # น้ำหนักรายแถว (0, 0.5, 1) แทนได้แม่นยำ
+AGGREGATE_DTYPES = {"ลาป่วย/ลากิจ": "float32", "ขาด": "float32", "สาย": "int32"}
+
+
+# ----------------------------------------------------------------------------------
+# โหลดข้อมูล
+# ----------------------------------------------------------------------------------
+# แต่ละรายการเป็นไฟล์, โฟลเดอร์ หรือ glob ก็ได้ (เช่น "branches/**/*.xlsx")
+DEFAULT_SOURCES = ["attendances.xlsx"]
+# ไฟล์ Parquet เดิมใช้ตั้งต้นที่เก็บเฉพาะเมื่อยังไม่มีไฟล์ต้นทางจริง
+# เมื่อมีไฟล์ Excel แล้วข้อมูลตั้งต้นจะถูกลบ (ไม่นับคู่กับแถวที่แก้ไขแล้วใน Excel)
+SEED_SOURCES = ["attendances.parquet"]
+
+
+def sync_sources(sources=DEFAULT_SOURCES, store_path=attendance_store.STORE_PATH, force=False, max_workers=None,
+                 seed_sources=SEED_SOURCES):
+    """นำเข้าไฟล์ต้นทางที่เปลี่ยนเข้าสู่ที่เก็บ (หลายไฟล์แปลงพร้อมกัน) แล้วคืนลายเซ็นของที่เก็บ"""
+    file_paths = attendance_store.expand_sources(sources)
+    seeds = attendance_store.expand_sources(seed_sources)
+    if file_paths:
+        attendance_store.import_files(file_paths, store_path, force=force, max_workers=max_workers, retired=seeds)
+    elif seeds:
+        attendance_store.import_files(seeds, store_path, force=force, max_workers=max_workers)
+    return attendance_store.store_signature(store_path)
+
+
+def load_data(sources=DEFAULT_SOURCES, store_path=attendance_store.STORE_PATH, seed_sources=SEED_SOURCES):
+    """นำเข้าไฟล์ต้นทางที่เปลี่ยนแล้วอ่านข้อมูลดิบทั้งหมดจากที่เก็บ"""
+    sync_sources(sources, store_path, seed_sources=seed_sources)
+    return attendance_store.read_store(store_path)
+
+
+# ----------------------------------------------------------------------------------
+# ฟังก์ชันแปลงค่าแบบทั้งคอลัมน์
+# ----------------------------------------------------------------------------------
+def clean_text_column(values):
+    """ตัดช่องว่างหัวท้ายและยุบช่องว่างซ้ำ (ค่าว่างจะกลายเป็น "nan" เหมือน astype(str))"""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    cleaned = pd.Index(uniques, dtype=object).astype(str).str.strip().str.replace(r"\s+", " ", regex=True)
+    return pd.Series(cleaned.take(codes), index=values.index)
+
+
+def clean_category_column(values, column):
+    """ทำความสะอาดคอลัมน์ชื่อ/แผนก/ข้อยกเว้น (แผนกที่ว่างเป็น "ไม่ระบุ")
+
+    ใช้ทั้งตอนประมวลผลและตอนแปลงค่าตัวกรองเป็นค่าดิบในที่เก็บ (attendance_query)
+    """
+    cleaned = clean_text_column(values)
+    if column == "แผนก":
+        cleaned = cleaned.replace({"nan": "ไม่ระบุ", "": "ไม่ระบุ"})
+    return cleaned
+
+
+def parse_time_column(values):
+    """แปลงคอลัมน์เวลา (string หรือ datetime.time) เป็นนาทีนับจากเที่ยงคืน (int16) ทั้งคอลัมน์
+
+    ลองรูปแบบ H:M:S ก่อน แล้วค่อยใช้ H:M กับค่าที่ยังแปลงไม่ได้
+    ค่าที่ว่างหรือแปลงไม่ได้เป็น MISSING_TIME
+    """
+    codes, uniques = pd.factorize(values)
+    text = pd.Series(pd.Index(uniques, dtype=object).astype(str)).str.strip()
+
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    for time_format in TIME_FORMATS:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=time_format, errors="coerce")
+
+    minutes = (parsed.dt.hour * 60 + parsed.dt.minute).fillna(MISSING_TIME).to_numpy(dtype="int16")
+    # รหัส -1 (ค่าว่าง) ชี้ไปที่ MISSING_TIME ตัวท้าย
+    lookup = np.append(minutes, np.int16(MISSING_TIME))
+    return pd.Series(lookup[codes], index=values.index)
+
+
+def format_minutes(minutes, missing="00:00"):
+    """แปลงนาทีนับจากเที่ยงคืนเป็นข้อความ HH:MM ทั้งคอลัมน์"""
+    minutes = pd.Series(minutes)
+    text = (
+        (minutes // 60).astype(str).str.zfill(2)
+        + ":"
+        + (minutes % 60).astype(str).str.zfill(2)
+    )
+    return text.where(minutes.to_numpy() != MISSING_TIME, missing)
+
+
+def sum_leaves(frame, keys):
+    """รวมยอดการลาทั้งสามประเภทตาม keys แล้วจัดชนิดข้อมูลของยอดรวม"""
+    return frame.groupby(keys, observed=True)[LEAVE_TYPES].sum().astype(AGGREGATE_DTYPES).reset_index()
+
+
+def categorize(frame):
+    """แปลงคอลัมน์ข้อความหลักเป็น categorical (ใช้หลังการรวมหลายชุดที่หมวดหมู่ต่างกัน)"""
+    for col in CATEGORY_COLUMNS:
+        if col in frame.columns and not isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = frame[col].astype("category")
+    return frame
+
+
+def leave_weights(exceptions):
+    """คืนค่า DataFrame น้ำหนักการลา (คอลัมน์ตาม LEAVE_TYPES) จากคอลัมน์ข้อยกเว้นแบบ categorical"""
+    weights = LEAVE_WEIGHTS.reindex(exceptions.cat.categories, fill_value=0.0).to_numpy(dtype=ROW_WEIGHT_DTYPE)
+    # รหัส -1 (ค่าว่าง) ชี้ไปที่แถวศูนย์ตัวท้าย
+    weights = np.vstack([weights, np.zeros(len(LEAVE_TYPES), dtype=ROW_WEIGHT_DTYPE)])
+    return pd.DataFrame(weights[exceptions.cat.codes.to_numpy()], index=exceptions.index, columns=LEAVE_TYPES)
+
+
+# ----------------------------------------------------------------------------------
+# ประมวลผลหลัก
+# ----------------------------------------------------------------------------------
+def preprocess_and_calculate_summary(df):
+    if df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    df_base = df.copy()
+
+    # --- การเตรียมข้อมูลเบื้องต้น ---
+    for col in CATEGORY_COLUMNS:
+        if col in df_base.columns:
+            df_base[col] = clean_category_column(df_base[col], col)
+
+    categorize(df_base)
+
+    if "วันที่" in df_base.columns:
+        df_base["วันที่"] = pd.to_datetime(df_base["วันที่"], errors='coerce')
+        df_base.dropna(subset=['วันที่'], inplace=True)
+        if df_base.empty: return pd.DataFrame(), pd.DataFrame() # เช็คซ้ำหลัง dropna
+
+        df_base["ปี"] = (df_base["วันที่"].dt.year + 543).astype("int16")
+        df_base["เดือน"] = df_base["วันที่"].dt.to_period("M")
+
+    # แปลงเวลาเข้า/ออกเป็นนาที แล้วทิ้งข้อความดิบ
+    if 'เข้างาน' in df_base.columns:
+        df_base['เวลาเข้า'] = parse_time_column(df_base.pop('เข้างาน'))
+
+    if 'ออกงาน' in df_base.columns:
+        df_base['เวลาออก'] = parse_time_column(df_base.pop('ออกงาน'))
+
+    # --- คำนวณประเภทการลา (lookup ตามหมวดของข้อยกเว้น) ---
+    df_base[LEAVE_TYPES] = leave_weights(df_base["ข้อยกเว้น"])
+
+    summary = sum_leaves(df_base, ["ชื่อ-สกุล", "แผนก"])
+
+    return df_base, summary
+
+
+# ----------------------------------------------------------------------------------
+# Cube สรุปล่วงหน้า (ปี, เดือน, แผนก, พนักงาน)
+# ----------------------------------------------------------------------------------
+CUBE_KEYS = ["ปี", "เดือน", "แผนก", "ชื่อ-สกุล"]
+
+
+def build_leave_cube(df_base):
+    """รวมยอดการลาทั้งสามประเภทต่อ (ปี, เดือน, แผนก, ชื่อ-สกุล) เพียงครั้งเดียวหลังประมวลผล"""
+    if df_base.empty:
+        return pd.DataFrame(columns=CUBE_KEYS + LEAVE_TYPES)
+    return sum_leaves(df_base, CUBE_KEYS)
+
+
+def combine_parts(parts):
+    """รวมผลประมวลผลราย part [(cube, leave_rows), ...] เป็นชุดเดียว
+
+    cube เป็นผลรวมจึงรวมต่อกันได้โดยตรง ทำให้ประมวลผลเฉพาะ part ใหม่แล้วรวมกับของเดิมได้
+    """
+    parts = [(cube, rows) for cube, rows in parts if not cube.empty]
+    if not parts:
+        return pd.DataFrame(columns=CUBE_KEYS + LEAVE_TYPES), pd.DataFrame()
+    if len(parts) == 1:
+        return parts[0]
+
+    cube = sum_leaves(categorize(pd.concat([cube for cube, _ in parts], ignore_index=True)), CUBE_KEYS)
+    rows = categorize(pd.concat([rows for _, rows in parts], ignore_index=True))
+    return cube, rows
+
+
+def filter_rows(frame, year=None, month=None, department=None):
+    """กรองตามปี (พ.ศ.), เดือน (Period) และแผนก ใช้ได้ทั้งกับ cube และข้อมูลรายแถว"""
+    mask = np.ones(len(frame), dtype=bool)
+    if year is not None:
+        mask &= (frame["ปี"] == int(year)).to_numpy()
+    if month is not None:
+        mask &= (frame["เดือน"] == month).to_numpy()
+    if department is not None:
+        mask &= (frame["แผนก"] == department).to_numpy()
+    return frame if mask.all() else frame[mask]
+
+
+def rollup_summary(cube):
+    """ยุบ cube ที่กรองแล้วให้เป็นสรุปรายบุคคล (ชื่อ-สกุล, แผนก)"""
+    if cube.empty:
+        return pd.DataFrame(columns=["ชื่อ-สกุล", "แผนก"] + LEAVE_TYPES)
+    return sum_leaves(cube, ["ชื่อ-สกุล", "แผนก"])
+
+
+# ----------------------------------------------------------------------------------
+# ดัชนีรายพนักงาน (สำหรับรายละเอียดวันลาในแต่ละแท็บ)
+# ----------------------------------------------------------------------------------
+EXCEPTION_LEAVE_TYPE = {exception: leave for exception, (leave, _) in LEAVE_EXCEPTIONS.items()}
+
+
+def leave_rows(df_base):
+    """เฉพาะแถวที่เป็นการลา/ขาด/สาย เรียงวันที่ล่าสุดก่อน (ข้อมูลรายแถวส่วนเดียวที่แดชบอร์ดต้องใช้)"""
+    if df_base.empty:
+        return df_base
+    leave_type = df_base["ข้อยกเว้น"].map(EXCEPTION_LEAVE_TYPE)
+    return df_base[leave_type.notna().to_numpy()].sort_values("วันที่", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def build_employee_index(df_base):
+    """สร้างดัชนี (ชื่อ-สกุล, ประเภทการลา) -> ตำแหน่งแถว
+
+    เก็บเฉพาะแถวที่เป็นการลา/ขาด/สาย เรียงวันที่ล่าสุดก่อนไว้แล้ว
+    การเปิดดูรายละเอียดจึงเป็นการหยิบแถวของพนักงานคนเดียว ไม่ต้องสแกนทั้งตาราง
+    """
+    rows = leave_rows(df_base)
+    if rows.empty:
+        return {"rows": rows, "positions": {}}
+    groups = rows.groupby(["ชื่อ-สกุล", rows["ข้อยกเว้น"].map(EXCEPTION_LEAVE_TYPE)], observed=True, sort=False)
+    return {"rows": rows, "positions": groups.indices}
+
+
+def employee_rows(index, employee, leave):
+    """คืนแถวการลาประเภท leave ของพนักงาน (เรียงวันที่ล่าสุดก่อน)"""
+    positions = index["positions"].get((employee, leave))
+    if positions is None:
+        return index["rows"].iloc[0:0]
+    return index["rows"].iloc[positions]
+
+
+# ----------------------------------------------------------------------------------
+# ประมวลผลทั้งชุด (ราย part แล้วรวม) และตารางอันดับ
+# ----------------------------------------------------------------------------------
+def summarize_batch(df_raw):
+    """ประมวลผลข้อมูลดิบชุดหนึ่ง คืน (cube, leave_rows) ซึ่งเป็นทุกอย่างที่แดชบอร์ดต้องใช้"""
+    df_base, _ = preprocess_and_calculate_summary(df_raw)
+    return build_leave_cube(df_base), leave_rows(df_base)
+
+
+def build_outputs(parts):
+    """รวมผลราย part แล้วคืน (summary, cube, employee_index)"""
+    cube, rows = combine_parts(parts)
+    return rollup_summary(cube), cube, build_employee_index(rows)
+
+
+def process_store(store_path=attendance_store.STORE_PATH):
+    """ประมวลผลทุกชุดนำเข้าในที่เก็บ (สำหรับงานเบื้องหลัง/CLI ที่ไม่มีแคชของ Streamlit)"""
+    batches = attendance_store.group_batches(attendance_store.store_signature(store_path))
+    return build_outputs(
+        summarize_batch(attendance_store.read_parts(part for part, *_ in batch)) for batch in batches
+    )
+
+
+def ranking_size(summary):
+    """จำนวนอันดับทั้งหมด (แถวสุดท้ายของอันดับไม่แสดง ตามพฤติกรรมเดิม)"""
+    return max(len(summary) - 1, 0)
+
+
+def build_ranking(summary, leave, top_n=None, offset=0):
+    """ตารางอันดับของประเภทการลา leave (มากไปน้อย) เฉพาะอันดับที่ offset+1 ถึง offset+top_n
+
+    เลือกเฉพาะ k แถวบนสุดด้วย nlargest (ไม่เรียงทั้งตาราง) ค่าเท่ากันเรียงตามลำดับเดิมในตาราง
+    top_n=None คืนทุกอันดับ
+    """
+    columns = ["ชื่อ-สกุล", "แผนก", leave]
+    stop = ranking_size(summary) if top_n is None else min(offset + top_n, ranking_size(summary))
+    if stop <= offset:
+        return pd.DataFrame(columns=["อันดับ"] + columns)
+
+    ranking = summary[columns].nlargest(stop, leave, keep="first").iloc[offset:].reset_index(drop=True)
+    ranking.insert(0, "อันดับ", range(offset + 1, stop + 1))
+    return ranking
+
+
+# ----------------------------------------------------------------------------------
+# ผลลัพธ์ที่คำนวณไว้ล่วงหน้า (สร้างด้วย attendance_cli.py build)
+# ----------------------------------------------------------------------------------
+ARTIFACTS_PATH = "artifacts"
+ARTIFACT_MANIFEST = "manifest.json"
+ARTIFACT_VERSION = 2  # เพิ่มเมื่อโครงสร้างคอลัมน์ของผลลัพธ์เปลี่ยน ผลลัพธ์รุ่นเก่าจะถูกข้าม
+ARTIFACT_FILES = {"summary": "summary.parquet", "cube": "cube.parquet", "leave_rows": "leave_rows.parquet"}
+
+
+def _signature_to_json(signature):
+    return [list(entry) for entry in signature]
+
+
+def _read_artifact_manifest(out_dir):
+    with open(os.path.join(out_dir, ARTIFACT_MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_artifacts(outputs, signature, out_dir=ARTIFACTS_PATH):
+    """เขียน summary/cube/แถวการลา ลงดิสก์ พร้อมลายเซ็นของที่เก็บที่ใช้สร้าง
+
+    เขียนลงไฟล์ชั่วคราวแล้วแทนที่ด้วย os.replace และลบ manifest เดิมก่อนสลับไฟล์
+    ผู้อ่านจึงเห็นผลลัพธ์ชุดเดิมครบ, ไม่มีผลลัพธ์ หรือชุดใหม่ครบ ไม่เห็นไฟล์ที่เขียนค้างครึ่งทาง
+    """
+    summary, cube, employee_index = outputs
+    os.makedirs(out_dir, exist_ok=True)
+    frames = {"summary": summary, "cube": cube, "leave_rows": employee_index["rows"]}
+    for name, frame in frames.items():
+        frame.to_parquet(os.path.join(out_dir, ARTIFACT_FILES[name] + ".tmp"), index=False)
+
+    manifest_path = os.path.join(out_dir, ARTIFACT_MANIFEST)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    for file_name in ARTIFACT_FILES.values():
+        path = os.path.join(out_dir, file_name)
+        os.replace(path + ".tmp", path)
+
+    manifest = {
+        "version": ARTIFACT_VERSION,
+        "store_signature": _signature_to_json(signature),
+        "built_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "rows": {name: len(frame) for name, frame in frames.items()},
+    }
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+
+def read_artifacts(signature, out_dir=ARTIFACTS_PATH):
+    """อ่านผลลัพธ์ล่วงหน้า คืน (summary, cube, employee_index) หรือ None ถ้าไม่มี/ไม่ตรงกับข้อมูลปัจจุบัน
+
+    ถ้าอ่านไม่ได้ (กำลังเขียนใหม่หรือไฟล์เสีย) ก็คืน None ให้ผู้เรียกคำนวณจากที่เก็บแทน
+    """
+    try:
+        manifest = _read_artifact_manifest(out_dir)
+        if manifest.get("version") != ARTIFACT_VERSION or manifest.get("store_signature") != _signature_to_json(signature):
+            return None
+        frames = {name: pd.read_parquet(os.path.join(out_dir, file_name)) for name, file_name in ARTIFACT_FILES.items()}
+        # manifest ถูกแทนที่ระหว่างอ่าน: ไฟล์ที่อ่านได้อาจมาจากคนละชุด
+        if _read_artifact_manifest(out_dir) != manifest:
+            return None
+    except (OSError, ValueError):
+        return None
+    return frames["summary"], frames["cube"], build_employee_index(frames["leave_rows"])
@@ -0,0 +1,170 @@
+"""จับเวลาแต่ละขั้นของแดชบอร์ดต่อการ rerun (ไม่มีการเรียก Streamlit)
+
+แต่ละ rerun สร้าง RunProfile หนึ่งตัว บันทึกเวลา/จำนวนแถวเข้า-ออกของแต่ละขั้น
+และจำนวน cache hit/miss ของฟังก์ชันที่ cache ไว้ แล้วต่อท้ายเป็น JSON หนึ่งบรรทัด
+ในไฟล์ log เพื่อนำมารวมสถิติข้าม session ได้ (ดู `attendance_cli.py profile`)
+ไฟล์ log ถูกหมุนเมื่อเกินขนาดที่กำหนด (เก็บไฟล์เก่าไว้ .1 ถึง .N) จึงไม่โตไม่จำกัด
+"""
+import contextlib
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+PROFILE_LOG_PATH = os.path.join("logs", "dashboard_profile.jsonl")
+PROFILE_LOG_MAX_MB = 10  # หมุนไฟล์ log เมื่อใหญ่เกินค่านี้
+PROFILE_LOG_BACKUPS = 3  # จำนวนไฟล์เก่าที่เก็บไว้
+
+# หลาย session เขียนไฟล์เดียวกันจากหลาย thread ใน process เดียว
+_log_lock = threading.Lock()
+
+
+def count_rows(value):
+    """จำนวนแถวของ DataFrame (หรือผลรวมของ DataFrame ใน tuple) ถ้านับไม่ได้คืน None"""
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, tuple):
+        frames = [item for item in value if isinstance(item, pd.DataFrame)]
+        return sum(len(frame) for frame in frames) if frames else None
+    return None
+
+
+class RunProfile:
+    """ผลการจับเวลาของการ rerun หนึ่งครั้ง"""
+
+    def __init__(self, session_id=None):
+        self.session_id = session_id
+        self.run_id = uuid.uuid4().hex
+        self.started_at = datetime.datetime.now().isoformat(timespec="milliseconds")
+        self.stages = []
+        self.cache = {}
+        self.context = {}
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        """จับเวลาขั้น `name` ตั้งค่า rows_out ได้จาก dict ที่ yield ออกมา"""
+        entry = {"stage": name, "seconds": None, "rows_in": rows_in, "rows_out": None}
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry["seconds"] = round(time.perf_counter() - start, 6)
+            self.stages.append(entry)
+
+    def cached_call(self, name, func, *args):
+        """เรียกฟังก์ชันที่ cache ไว้ นับเป็น miss ถ้าตัวฟังก์ชันเรียก cache_miss(name) ระหว่างนั้น"""
+        counts = self._cache_counts(name)
+        misses = counts["misses"]
+        result = func(*args)
+        counts["calls"] += 1
+        if counts["misses"] == misses:
+            counts["hits"] += 1
+        return result
+
+    def cache_miss(self, name):
+        """เรียกจากภายในตัวฟังก์ชันที่ cache ไว้ (ซึ่งทำงานเฉพาะตอน miss)"""
+        self._cache_counts(name)["misses"] += 1
+
+    def _cache_counts(self, name):
+        return self.cache.setdefault(name, {"calls": 0, "hits": 0, "misses": 0})
+
+    def stage_frame(self):
+        return pd.DataFrame(self.stages, columns=["stage", "seconds", "rows_in", "rows_out"])
+
+    def cache_frame(self):
+        rows = [
+            {"function": name, **counts}
+            for name, counts in self.cache.items()
+        ]
+        return pd.DataFrame(rows, columns=["function", "calls", "hits", "misses"])
+
+    def total_seconds(self):
+        return time.perf_counter() - self._start
+
+    def to_record(self):
+        return {
+            "timestamp": self.started_at,
+            "session_id": self.session_id,
+            "run_id": self.run_id,
+            "total_seconds": round(self.total_seconds(), 6),
+            "context": self.context,
+            "stages": self.stages,
+            "cache": self.cache,
+        }
+
+    def write_log(self, path=PROFILE_LOG_PATH, max_bytes=PROFILE_LOG_MAX_MB * 2**20, backups=PROFILE_LOG_BACKUPS):
+        """ต่อท้ายผลของ rerun นี้เป็น JSON หนึ่งบรรทัด (หมุนไฟล์ก่อนถ้าเกิน max_bytes)"""
+        line = json.dumps(self.to_record(), ensure_ascii=False, default=str)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with _log_lock:
+            rotate_log(path, max_bytes, backups)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def rotate_log(path, max_bytes, backups):
+    """ย้าย path -> path.1 -> ... -> path.<backups> เมื่อไฟล์ใหญ่ถึง max_bytes (ไฟล์เก่าสุดถูกลบ)"""
+    try:
+        if os.path.getsize(path) < max_bytes:
+            return
+    except FileNotFoundError:
+        return
+    if backups < 1:
+        os.remove(path)
+        return
+    for i in range(backups - 1, 0, -1):
+        if os.path.exists(f"{path}.{i}"):
+            os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def log_files(path=PROFILE_LOG_PATH):
+    """ไฟล์ log ทั้งหมดรวมไฟล์ที่หมุนแล้ว เรียงจากเก่าไปใหม่"""
+    rotated = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        rotated.append(f"{path}.{i}")
+        i += 1
+    return rotated[::-1] + [path]
+
+
+# ----------------------------------------------------------------------------------
+# รวมสถิติจากไฟล์ log
+# ----------------------------------------------------------------------------------
+def read_log(path=PROFILE_LOG_PATH):
+    """อ่านไฟล์ log (รวมไฟล์ที่หมุนแล้ว) เป็นตารางหนึ่งแถวต่อขั้นต่อ rerun (ข้ามบรรทัดที่เสีย)"""
+    rows = []
+    for file_path in log_files(path):
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                for entry in record.get("stages", []):
+                    rows.append({"session_id": record.get("session_id"), "run_id": record.get("run_id"), **entry})
+                rows.append({
+                    "session_id": record.get("session_id"),
+                    "run_id": record.get("run_id"),
+                    "stage": "total",
+                    "seconds": record.get("total_seconds"),
+                })
+    return pd.DataFrame(rows, columns=["session_id", "run_id", "stage", "seconds", "rows_in", "rows_out"])
+
+
+def summarize_log(stages):
+    """สรุปเวลาต่อขั้น: จำนวนครั้ง, ค่ากลาง, p95, สูงสุด และเวลารวม (เรียงตามเวลารวมมากก่อน)"""
+    grouped = stages.groupby("stage")["seconds"]
+    summary = pd.DataFrame({
+        "runs": grouped.count(),
+        "median_s": grouped.median(),
+        "p95_s": grouped.quantile(0.95),
+        "max_s": grouped.max(),
+        "total_s": grouped.sum(),
+    })
+    return summary.sort_values("total_s", ascending=False).reset_index()
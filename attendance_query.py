@@ -0,0 +1,202 @@
+"""โหมด lazy: กรองและรวมยอดการลาด้วย pushdown query บนที่เก็บ Parquet (pyarrow.dataset)
+
+ไม่โหลดประวัติทั้งหมดเข้า pandas: ตัวกรองปี/เดือนถูกแปลงเป็นเงื่อนไขบนพาร์ทิชัน (year, month)
+ซึ่งทำให้ข้ามไฟล์ที่ไม่เกี่ยวข้องได้ทั้งไฟล์ ตัวกรองแผนก/พนักงานถูกแปลงเป็นรายการค่าดิบในที่เก็บ
+(ค่าดิบหลายแบบอาจทำความสะอาดแล้วเป็นค่าเดียวกัน) ส่วนการรวมยอดทำใน Arrow ทีละ batch
+แล้วนำเข้า pandas เฉพาะผลลัพธ์ที่รวมแล้ว
+
+ความหมายของตัวกรองตรงกับ selectbox ในแดชบอร์ด: ปีเป็น พ.ศ., เดือนเป็น Period,
+แผนก/ชื่อเป็นค่าหลังทำความสะอาด ตรวจความตรงกันกับโหมดปกติด้วย `attendance_cli.py parity`
+"""
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+import attendance_pipeline
+import attendance_store
+
+# คอลัมน์ที่ใช้รวมยอด: ข้อยกเว้นต้องอยู่ใน key เพราะน้ำหนักการลาคิดหลังทำความสะอาดค่า
+GROUP_COLUMNS = ["year", "month", "แผนก", "ชื่อ-สกุล", "ข้อยกเว้น"]
+COUNT_COLUMN = "count_all"
+COMPACT_EVERY = 64  # รวมผลย่อยของแต่ละ batch ทุกกี่ batch (จำกัดหน่วยความจำ)
+DETAIL_COLUMNS = [
+    "วันที่", "ชื่อ-สกุล", "แผนก", "ข้อยกเว้น", "ปี", "เดือน", "เวลาเข้า", "เวลาออก",
+] + attendance_pipeline.LEAVE_TYPES
+
+
+# ----------------------------------------------------------------------------------
+# แปลงตัวกรองเป็นเงื่อนไขบนที่เก็บ
+# ----------------------------------------------------------------------------------
+def _and(left, right):
+    return right if left is None else left & right
+
+
+def distinct_values(dataset, column, expression=None):
+    """ค่าดิบที่ไม่ซ้ำของคอลัมน์ (สแกนเฉพาะคอลัมน์นั้น ทีละ batch)"""
+    uniques = set()
+    for batch in dataset.to_batches(columns=[column], filter=expression):
+        uniques.update(pc.unique(batch.column(0)).to_pylist())
+    return sorted(uniques, key=lambda value: (value is None, value or ""))
+
+
+def raw_values_for(dataset, column, targets, expression=None):
+    """ค่าดิบในที่เก็บที่ทำความสะอาดแล้วตรงกับค่าใน targets"""
+    raw = distinct_values(dataset, column, expression)
+    if not raw:
+        return []
+    cleaned = attendance_pipeline.clean_category_column(pd.Series(pd.Categorical(raw)), column)
+    return [value for value, clean in zip(raw, cleaned) if clean in targets]
+
+
+def _match(column, raw_values):
+    """เงื่อนไขคอลัมน์ตรงกับค่าดิบใดค่าหนึ่ง (รวมค่าว่างถ้ามี)"""
+    values = [value for value in raw_values if value is not None]
+    expression = ds.field(column).isin(pa.array(values, type=pa.string()))
+    if len(values) < len(raw_values):
+        expression = expression | ds.field(column).is_null()
+    return expression
+
+
+def filter_expression(dataset, year=None, month=None, department=None, employee=None):
+    """แปลงตัวกรองของแดชบอร์ดเป็นเงื่อนไข pyarrow (None = ไม่กรอง)"""
+    expression = None
+    if year is not None:
+        expression = _and(expression, ds.field("year") == int(year) - 543)
+    if month is not None:
+        expression = _and(expression, (ds.field("year") == month.year) & (ds.field("month") == month.month))
+    # ค่าดิบของแผนก/ชื่อค้นเฉพาะในพาร์ทิชันที่ผ่านตัวกรองปี/เดือนแล้ว
+    if department is not None:
+        raw = raw_values_for(dataset, "แผนก", {department}, expression)
+        expression = _and(expression, _match("แผนก", raw))
+    if employee is not None:
+        raw = raw_values_for(dataset, "ชื่อ-สกุล", {employee}, expression)
+        expression = _and(expression, _match("ชื่อ-สกุล", raw))
+    return expression
+
+
+# ----------------------------------------------------------------------------------
+# Cube และแถวการลาแบบ pushdown
+# ----------------------------------------------------------------------------------
+def _count_groups(tables):
+    table = pa.concat_tables(tables)
+    aggregate = table.group_by(GROUP_COLUMNS).aggregate([(COUNT_COLUMN, "sum")])
+    names = [COUNT_COLUMN if name == f"{COUNT_COLUMN}_sum" else name for name in aggregate.column_names]
+    return aggregate.rename_columns(names)
+
+
+def count_rows_by_group(dataset, expression=None):
+    """จำนวนแถวต่อ (year, month, แผนก, ชื่อ-สกุล, ข้อยกเว้น) โดยสแกนทีละ batch"""
+    partials = []
+    for batch in dataset.to_batches(columns=GROUP_COLUMNS, filter=expression):
+        if batch.num_rows:
+            partials.append(pa.Table.from_batches([batch]).group_by(GROUP_COLUMNS).aggregate([([], COUNT_COLUMN)]))
+        if len(partials) >= COMPACT_EVERY:
+            partials = [_count_groups(partials)]
+    if not partials:
+        return None
+    return _count_groups(partials)
+
+
+def query_cube(store_path=attendance_store.STORE_PATH, year=None, month=None, department=None, employee=None):
+    """cube (ปี, เดือน, แผนก, ชื่อ-สกุล) ของข้อมูลที่ผ่านตัวกรอง เหมือน filter_rows บน cube ในหน่วยความจำ"""
+    if not attendance_store.store_exists(store_path):
+        return attendance_pipeline.build_leave_cube(pd.DataFrame())
+    dataset = attendance_store.open_dataset(store_path)
+    counts = count_rows_by_group(dataset, filter_expression(dataset, year, month, department, employee))
+    if counts is None:
+        return attendance_pipeline.build_leave_cube(pd.DataFrame())
+
+    groups = counts.to_pandas(strings_to_categorical=True)
+    for col in attendance_pipeline.CATEGORY_COLUMNS:
+        groups[col] = attendance_pipeline.clean_category_column(groups[col], col)
+    attendance_pipeline.categorize(groups)
+
+    groups["ปี"] = (groups["year"] + 543).astype("int16")
+    groups["เดือน"] = pd.PeriodIndex.from_fields(year=groups["year"], month=groups["month"], freq="M")
+    weights = attendance_pipeline.leave_weights(groups["ข้อยกเว้น"])
+    groups[attendance_pipeline.LEAVE_TYPES] = weights.mul(groups[COUNT_COLUMN].to_numpy(), axis=0)
+    return attendance_pipeline.sum_leaves(groups, attendance_pipeline.CUBE_KEYS)
+
+
+def query_summary(store_path=attendance_store.STORE_PATH, year=None, month=None, department=None):
+    """สรุปรายบุคคลของข้อมูลที่ผ่านตัวกรอง (เหมือน rollup_summary(filter_rows(cube, ...)))"""
+    return attendance_pipeline.rollup_summary(query_cube(store_path, year, month, department))
+
+
+def query_employee_rows(store_path, employee, leave, year=None, month=None, department=None):
+    """แถวการลาประเภท leave ของพนักงานหนึ่งคน เรียงวันที่ล่าสุดก่อน (เหมือน employee_rows + filter_rows)"""
+    if not attendance_store.store_exists(store_path):
+        return pd.DataFrame(columns=DETAIL_COLUMNS)
+    dataset = attendance_store.open_dataset(store_path)
+    expression = filter_expression(dataset, year, month, department, employee)
+    exceptions = {exception for exception, kind in attendance_pipeline.EXCEPTION_LEAVE_TYPE.items() if kind == leave}
+    expression = _and(expression, _match("ข้อยกเว้น", raw_values_for(dataset, "ข้อยกเว้น", exceptions, expression)))
+
+    raw = dataset.to_table(columns=attendance_store.DATA_COLUMNS, filter=expression).to_pandas(strings_to_categorical=True)
+    df_base, _ = attendance_pipeline.preprocess_and_calculate_summary(raw)
+    if df_base.empty:
+        return pd.DataFrame(columns=DETAIL_COLUMNS)
+    return attendance_pipeline.leave_rows(df_base)[DETAIL_COLUMNS]
+
+
+# ----------------------------------------------------------------------------------
+# ตรวจความตรงกันกับโหมดในหน่วยความจำ
+# ----------------------------------------------------------------------------------
+def _comparable(frame, keys):
+    frame = frame.astype({col: str for col in keys})
+    return frame.sort_values(keys, kind="stable").reset_index(drop=True)
+
+
+def parity_filters(cube, samples=3):
+    """ชุดตัวกรองสำหรับตรวจ: ทั้งหมด, ปี, ปี+เดือน, ปี+เดือน+แผนก และแผนกอย่างเดียว"""
+    combos = [{}]
+    for year in sorted(cube["ปี"].unique(), reverse=True)[:samples]:
+        year = int(year)
+        in_year = cube[cube["ปี"] == year]
+        month = in_year["เดือน"].max()
+        department = in_year.loc[in_year["เดือน"] == month, "แผนก"].iloc[0]
+        combos += [
+            {"year": year},
+            {"year": year, "month": month},
+            {"year": year, "month": month, "department": department},
+        ]
+    for department in cube["แผนก"].unique()[:samples]:
+        combos.append({"department": department})
+    return combos
+
+
+def check_parity(store_path=attendance_store.STORE_PATH, samples=3):
+    """เทียบผลโหมด lazy กับโหมดในหน่วยความจำ คืนรายการข้อความของจุดที่ไม่ตรงกัน (ว่าง = ตรงกันทั้งหมด)"""
+    summary, cube, employee_index = attendance_pipeline.process_store(store_path)
+    mismatches = []
+
+    def compare(label, expected, actual, keys):
+        try:
+            pd.testing.assert_frame_equal(_comparable(expected, keys), _comparable(actual, keys), check_categorical=False)
+        except AssertionError as error:
+            mismatches.append(f"{label}: {str(error).splitlines()[0]}")
+
+    for filters in parity_filters(cube, samples):
+        expected_cube = attendance_pipeline.filter_rows(cube, **filters)
+        compare(f"cube {filters}", expected_cube, query_cube(store_path, **filters), attendance_pipeline.CUBE_KEYS)
+        compare(
+            f"summary {filters}",
+            attendance_pipeline.rollup_summary(expected_cube),
+            query_summary(store_path, **filters),
+            ["ชื่อ-สกุล", "แผนก"],
+        )
+
+    # รายละเอียดวันลาตรวจด้วยชุดตัวกรองเดียวกับ cube โดยเลือกพนักงานที่มีการลาในช่วงนั้น
+    # (ตัวกรองเดือน/แผนกจะได้เทียบแถวจริง ไม่ใช่ผลว่างทั้งสองฝั่ง)
+    detail_columns = ["วันที่", "ชื่อ-สกุล", "ข้อยกเว้น", "เวลาเข้า", "เวลาออก"] + attendance_pipeline.LEAVE_TYPES
+    for filters in parity_filters(cube, samples):
+        in_range = attendance_pipeline.filter_rows(cube, **filters)
+        for leave in attendance_pipeline.LEAVE_TYPES:
+            for employee in in_range.loc[in_range[leave] > 0, "ชื่อ-สกุล"].unique()[:samples]:
+                expected = attendance_pipeline.filter_rows(
+                    attendance_pipeline.employee_rows(employee_index, employee, leave), **filters
+                )[detail_columns]
+                actual = query_employee_rows(store_path, employee, leave, **filters)[detail_columns]
+                compare(f"rows {employee}/{leave} {filters}", expected, actual, ["วันที่", "เวลาเข้า", "เวลาออก"])
+    return mismatches
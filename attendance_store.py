@@ -0,0 +1,540 @@
+"""ที่เก็บข้อมูลการลงเวลาแบบ Parquet (แบ่งพาร์ทิชันตามปี/เดือน)
+
+Parquet คือที่เก็บหลัก ส่วน Excel เป็นเพียงรูปแบบนำเข้า:
+ไฟล์ Excel ใหม่จะถูกแปลงเพียงครั้งเดียว และต่อท้ายเฉพาะแถวที่ยังไม่มีในที่เก็บ
+ไฟล์ part ของแต่ละไฟล์ต้นทางถูกบันทึกไว้ใน manifest เมื่อไฟล์ต้นทางถูกส่งออกใหม่
+(แก้หรือลบบางแถว) ข้อมูลเดิมของไฟล์นั้นจะถูกแทนที่ทั้งหมด ไม่ค้างอยู่คู่กับข้อมูลใหม่
+ไฟล์ต้นทางระบุได้ทั้งเป็นไฟล์, โฟลเดอร์ หรือ glob (เช่นไฟล์รายเดือนของแต่ละสาขา)
+และไฟล์ที่ต้องอ่านใหม่หลายไฟล์จะถูกแปลงพร้อมกันใน process pool
+"""
+import concurrent.futures
+import contextlib
+import datetime
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ----------------------------------------------------------------------------------
+# โครงสร้างข้อมูล
+# ----------------------------------------------------------------------------------
+STORE_PATH = "attendances_store"
+MANIFEST_NAME = "_manifest.json"  # ขึ้นต้นด้วย "_" เพื่อให้ pyarrow ข้ามไฟล์นี้ตอนอ่าน dataset
+LOCK_NAME = "_import.lock"
+MANIFEST_VERSION = 2  # 2: บันทึกไฟล์ part ของแต่ละไฟล์ต้นทาง (ที่เก็บรุ่นเก่าจะถูกสร้างใหม่หนึ่งครั้ง)
+
+DATA_COLUMNS = ["ชื่อ-สกุล", "แผนก", "วันที่", "เข้างาน", "ออกงาน", "ข้อยกเว้น"]
+HASH_COLUMN = "_row_hash"
+SOURCE_EXTENSIONS = (".xlsx", ".parquet")  # openpyxl อ่าน .xls รุ่นเก่าไม่ได้ ต้องบันทึกเป็น .xlsx ก่อน
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("year", pa.int16()), ("month", pa.int8())]), flavor="hive"
+)
+
+STORE_SCHEMA = pa.schema(
+    [
+        ("ชื่อ-สกุล", pa.string()),
+        ("แผนก", pa.string()),
+        ("วันที่", pa.timestamp("ns")),
+        ("เข้างาน", pa.string()),
+        ("ออกงาน", pa.string()),
+        ("ข้อยกเว้น", pa.string()),
+        (HASH_COLUMN, pa.uint64()),
+        ("year", pa.int16()),
+        ("month", pa.int8()),
+    ]
+)
+
+# การนำเข้าต้องทำทีละงาน: lock นี้กันหลาย session ใน process เดียวกัน
+# ส่วนไฟล์ล็อกในที่เก็บ (store_lock) กันหลาย process เช่นแดชบอร์ดกับ cron ของ attendance_cli.py
+_import_lock = threading.Lock()
+
+
+# ----------------------------------------------------------------------------------
+# ฟังก์ชันช่วย
+# ----------------------------------------------------------------------------------
+def file_stat(file_path):
+    """คืนค่า (mtime_ns, size) ของไฟล์ ใช้ตรวจว่าไฟล์ต้นทางเปลี่ยนหรือไม่"""
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+# (path, mtime_ns, size) -> sha256 เพื่อไม่ต้องอ่านไฟล์ทั้งไฟล์ซ้ำถ้า stat ไม่เปลี่ยน
+_hash_memo = {}
+
+
+def file_signature(file_path):
+    """คืนค่า (mtime_ns, size, sha256) ของไฟล์ ใช้เป็น cache key ของไฟล์ต้นทาง
+
+    hash ของเนื้อหาจะคำนวณใหม่เฉพาะเมื่อ mtime หรือขนาดไฟล์เปลี่ยน
+    """
+    mtime_ns, size = file_stat(file_path)
+    memo_key = (os.path.abspath(file_path), mtime_ns, size)
+    if memo_key not in _hash_memo:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        _hash_memo[memo_key] = digest.hexdigest()
+    return mtime_ns, size, _hash_memo[memo_key]
+
+
+def read_manifest(store_path=STORE_PATH):
+    manifest_path = os.path.join(store_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {"version": MANIFEST_VERSION, "sources": {}}
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(manifest, store_path=STORE_PATH):
+    os.makedirs(store_path, exist_ok=True)
+    manifest_path = os.path.join(store_path, MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+@contextlib.contextmanager
+def store_lock(store_path=STORE_PATH):
+    """ล็อกที่เก็บข้าม process ระหว่างอ่าน manifest, เขียนข้อมูล และเขียน manifest
+
+    ใช้ล็อกของระบบปฏิบัติการบนไฟล์ในโฟลเดอร์ที่เก็บ ล็อกจึงถูกปล่อยเองถ้า process ตายกลางทาง
+    """
+    os.makedirs(store_path, exist_ok=True)
+    with _import_lock, open(os.path.join(store_path, LOCK_NAME), "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # รอได้ครั้งละประมาณ 10 วินาที
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def store_exists(store_path=STORE_PATH):
+    if not os.path.isdir(store_path):
+        return False
+    for _, _, files in os.walk(store_path):
+        if any(name.endswith(".parquet") for name in files):
+            return True
+    return False
+
+
+def expand_sources(sources):
+    """แปลงรายการไฟล์/โฟลเดอร์/glob เป็นรายการไฟล์ต้นทางที่ไม่ซ้ำ
+
+    คงลำดับของ sources (ไฟล์ภายในโฟลเดอร์/glob เดียวกันเรียงตาม path)
+    โฟลเดอร์จะถูกค้นทุกชั้นย่อย ข้ามไฟล์ล็อกของ Excel (~$...) และนามสกุลที่ไม่รองรับ
+    """
+    found = {}
+    for source in sources:
+        if not source:
+            continue
+        if os.path.isdir(source):
+            candidates = glob.glob(os.path.join(source, "**", "*"), recursive=True)
+        elif glob.has_magic(source):
+            candidates = glob.glob(source, recursive=True)
+        else:
+            candidates = [source]
+        for path in sorted(candidates):
+            name = os.path.basename(path)
+            if os.path.isfile(path) and name.lower().endswith(SOURCE_EXTENSIONS) and not name.startswith("~$"):
+                found.setdefault(os.path.normpath(path), None)
+    return list(found)
+
+
+def read_source_file(file_path):
+    """อ่านไฟล์ต้นทาง (Excel หรือ Parquet) เป็น DataFrame ดิบ"""
+    if file_path.lower().endswith(".xlsx"):
+        return pd.read_excel(file_path, engine="openpyxl", dtype={"เข้างาน": str, "ออกงาน": str})
+    return pd.read_parquet(file_path)
+
+
+def normalize_frame(df):
+    """จัดคอลัมน์และชนิดข้อมูลให้ตรงกับโครงสร้างของที่เก็บ
+
+    แถวที่ไม่มีวันที่จะถูกตัดทิ้ง เพราะไม่สามารถจัดเข้าพาร์ทิชันได้
+    (และขั้นประมวลผลก็ตัดแถวเหล่านี้ทิ้งอยู่แล้ว)
+    """
+    frame = pd.DataFrame(index=df.index)
+    for col in DATA_COLUMNS:
+        if col == "วันที่":
+            values = df[col] if col in df.columns else pd.NaT
+            frame[col] = pd.to_datetime(values, errors="coerce").astype("datetime64[ns]")
+        else:
+            values = df[col] if col in df.columns else None
+            frame[col] = pd.Series(values, index=df.index, dtype=object).astype("string")
+    frame = frame.dropna(subset=["วันที่"]).reset_index(drop=True)
+
+    frame[HASH_COLUMN] = pd.util.hash_pandas_object(frame[DATA_COLUMNS], index=False).to_numpy()
+    frame["year"] = frame["วันที่"].dt.year.astype("int16")
+    frame["month"] = frame["วันที่"].dt.month.astype("int8")
+    return frame
+
+
+def parse_source_file(file_path):
+    """อ่านไฟล์ต้นทางแล้วจัดให้ตรงกับโครงสร้างของที่เก็บ (ทำงานใน process ลูกได้)"""
+    return normalize_frame(read_source_file(file_path))
+
+
+# ----------------------------------------------------------------------------------
+# อ่าน / เขียน
+# ----------------------------------------------------------------------------------
+def open_dataset(store_path=STORE_PATH):
+    return ds.dataset(store_path, format="parquet", partitioning=PARTITIONING, schema=STORE_SCHEMA)
+
+
+def part_token(part_path):
+    """รหัสชุดนำเข้าของไฟล์ part (part-<token>-<i>.parquet)"""
+    return os.path.basename(part_path).split("-")[1]
+
+
+def delete_parts(tokens, store_path=STORE_PATH):
+    """ลบไฟล์ part ทั้งหมดของชุดนำเข้าที่ระบุ"""
+    tokens = set(tokens)
+    if not tokens:
+        return
+    for part in list_parts(store_path):
+        if part_token(part) in tokens:
+            os.remove(part)
+
+
+def append_rows(df, store_path=STORE_PATH, normalized=False, token=None):
+    """ต่อท้ายเฉพาะแถวที่ยังไม่มีในที่เก็บ (เทียบด้วย hash ของทั้งแถว) คืนค่าจำนวนแถวที่เพิ่ม
+
+    ไฟล์ part ที่เขียนจะมีชื่อเป็น part-<token>-*.parquet (สุ่มใหม่ถ้าไม่ระบุ token)
+    """
+    frame = df if normalized else normalize_frame(df)
+    if frame.empty:
+        return 0
+
+    if store_exists(store_path):
+        existing = open_dataset(store_path).to_table(columns=[HASH_COLUMN]).column(HASH_COLUMN)
+        frame = frame[~frame[HASH_COLUMN].isin(existing.to_numpy())]
+        if frame.empty:
+            return 0
+
+    table = pa.Table.from_pandas(frame, schema=STORE_SCHEMA, preserve_index=False)
+    ds.write_dataset(
+        table,
+        store_path,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{token or uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return len(frame)
+
+
+def import_file(file_path, store_path=STORE_PATH, force=False):
+    """นำเข้าไฟล์ต้นทางเข้าสู่ที่เก็บ Parquet เพียงครั้งเดียวต่อเวอร์ชันของไฟล์
+
+    คืนค่าจำนวนแถวใหม่ที่ต่อท้าย (0 ถ้าเนื้อหาไฟล์ไม่เปลี่ยนตั้งแต่การนำเข้าครั้งก่อน,
+    None ถ้าอ่านไฟล์ไม่ได้ ดูสาเหตุได้จาก import_errors())
+    """
+    return import_files([file_path], store_path, force=force)[file_path]
+
+
+def _pending_signature(manifest, file_path, force):
+    """คืนลายเซ็น (mtime_ns, size, sha256) ถ้าไฟล์ต้องนำเข้าใหม่ หรือ None ถ้าไม่เปลี่ยน"""
+    seen = manifest["sources"].get(os.path.abspath(file_path))
+    mtime_ns, size = file_stat(file_path)
+    # sha256 ว่าง = การนำเข้าครั้งก่อนหยุดกลางทาง ต้องนำเข้าใหม่
+    if not force and seen and seen.get("sha256") and seen["mtime_ns"] == mtime_ns and seen["size"] == size:
+        return None
+    # mtime เปลี่ยนแต่เนื้อหาเหมือนเดิม (เช่น copy ทับ) ก็ไม่ต้องอ่านไฟล์ใหม่ แค่บันทึก stat ใหม่
+    return file_signature(file_path)
+
+
+def _parse_or_error(file_path):
+    try:
+        return parse_source_file(file_path), None
+    except Exception as error:
+        return None, error
+
+
+def _parse_files(file_paths, max_workers):
+    """แปลงหลายไฟล์พร้อมกัน คืน generator ของ (path, frame, error) ตามลำดับ file_paths
+
+    ไฟล์ที่แปลงไม่ได้ (เสีย, copy ไม่ครบ, รูปแบบผิด) ได้ frame เป็น None พร้อม error
+    โดยไม่หยุดไฟล์อื่น openpyxl ใช้ CPU และทำงาน thread เดียว จึงแยกเป็น process
+    (spawn เพื่อไม่ fork process ของ Streamlit ที่มีหลาย thread)
+    """
+    workers = min(len(file_paths), max_workers or os.cpu_count() or 1)
+    if workers < 2:
+        for file_path in file_paths:
+            yield (file_path, *_parse_or_error(file_path))
+        return
+
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(parse_source_file, file_path) for file_path in file_paths]
+        for file_path, future in zip(file_paths, futures):
+            try:
+                frame, error = future.result(), None
+            except Exception as exc:
+                frame, error = None, exc
+            yield file_path, frame, error
+
+
+def _record_failure(manifest, file_path, error):
+    """บันทึกไฟล์ที่นำเข้าไม่ได้ ไฟล์นี้จะไม่ถูกอ่านซ้ำจนกว่าจะเปลี่ยน (หรือ force)"""
+    try:
+        mtime_ns, size = file_stat(file_path)
+    except OSError:
+        mtime_ns = size = None  # stat ไม่ได้ ลองใหม่รอบถัดไป
+    if isinstance(error, concurrent.futures.BrokenExecutor):
+        mtime_ns = size = None  # process ลูกตาย ไม่ใช่ความผิดของไฟล์ ลองใหม่รอบถัดไป
+    manifest.setdefault("failed", {})[os.path.abspath(file_path)] = {
+        "mtime_ns": mtime_ns,
+        "size": size,
+        "error": f"{type(error).__name__}: {error}",
+        "failed_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def _failed_unchanged(manifest, file_path):
+    failed = manifest.get("failed", {}).get(os.path.abspath(file_path))
+    if not failed or failed["mtime_ns"] is None:
+        return False
+    try:
+        return (failed["mtime_ns"], failed["size"]) == file_stat(file_path)
+    except OSError:
+        return False
+
+
+def import_errors(store_path=STORE_PATH):
+    """ไฟล์ต้นทางที่นำเข้าไม่สำเร็จ (ที่ยังอยู่) dict path -> ข้อความ error"""
+    failed = read_manifest(store_path).get("failed", {})
+    return {path: entry["error"] for path, entry in failed.items() if os.path.exists(path)}
+
+
+def _record_source(manifest, file_path, signature, rows_added, rows_skipped=0, parts=()):
+    mtime_ns, size, sha256 = signature
+    manifest.get("failed", {}).pop(os.path.abspath(file_path), None)
+    manifest["sources"][os.path.abspath(file_path)] = {
+        "mtime_ns": mtime_ns,
+        "size": size,
+        "sha256": sha256,
+        "rows_added": rows_added,
+        "rows_skipped": rows_skipped,  # แถวที่มีอยู่แล้วจากไฟล์อื่น
+        "parts": list(parts),
+        "imported_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def _replace_source(manifest, store_path, file_path, frame, signature):
+    """แทนที่ข้อมูลเดิมของไฟล์ต้นทางด้วย frame คืนค่าจำนวนแถวที่เพิ่ม"""
+    key = os.path.abspath(file_path)
+    old_parts = manifest["sources"].get(key, {}).get("parts", [])
+    token = uuid.uuid4().hex
+    # บันทึกไว้ก่อนว่ากำลังแทนที่ (sha256 ว่าง) หากหยุดกลางทาง
+    # รอบถัดไปจะลบทั้ง part เก่าและใหม่ของไฟล์นี้แล้วนำเข้าใหม่ จึงไม่มีแถวซ้ำค้าง
+    manifest["sources"][key] = {"sha256": None, "parts": old_parts + [token]}
+    write_manifest(manifest, store_path)
+
+    delete_parts(old_parts, store_path)
+    rows_added = append_rows(frame, store_path, normalized=True, token=token)
+    _record_source(manifest, file_path, signature, rows_added, len(frame) - rows_added, [token] if rows_added else [])
+    write_manifest(manifest, store_path)
+    return rows_added
+
+
+def _sources_to_refill(manifest, replaced):
+    """ไฟล์ต้นทางอื่นที่ต้องเขียนใหม่หลังแทนที่ไฟล์ใน replaced
+
+    แถวที่ซ้ำข้ามไฟล์ถูกเก็บไว้ครั้งเดียว ไฟล์ที่เคยถูกข้ามแถวซ้ำอาจอาศัยแถวของไฟล์ที่ถูกแทนที่
+    จึงต้องนำเข้าใหม่ตามหลัง (เฉพาะไฟล์ที่ยังอยู่)
+    """
+    replaced = {os.path.abspath(file_path) for file_path in replaced}
+    if not any(manifest["sources"].get(key, {}).get("parts") for key in replaced):
+        return []
+    return [
+        key for key, entry in manifest["sources"].items()
+        if key not in replaced and entry.get("rows_skipped") and os.path.exists(key)
+    ]
+
+
+def _reset_legacy_store(manifest, file_paths, store_path, retired=()):
+    """ที่เก็บรุ่นเก่าไม่รู้ว่า part ใดมาจากไฟล์ต้นทางใด: ลบทั้งหมดแล้วนำเข้าใหม่
+
+    คืนรายการไฟล์ที่ต้องนำเข้า (file_paths และไฟล์ต้นทางเดิมใน manifest ที่ยังอยู่ ยกเว้น retired)
+    """
+    requested = {os.path.abspath(file_path) for file_path in list(file_paths) + list(retired)}
+    previous = [key for key in manifest["sources"] if key not in requested and os.path.exists(key)]
+    for part in list_parts(store_path):
+        os.remove(part)
+    write_manifest({"version": MANIFEST_VERSION, "sources": {}}, store_path)
+    return list(file_paths) + previous
+
+
+def import_files(file_paths, store_path=STORE_PATH, force=False, max_workers=None, retired=()):
+    """นำเข้าหลายไฟล์ต้นทาง: แปลงเฉพาะไฟล์ที่เปลี่ยนพร้อมกัน แล้วเขียนทีละไฟล์ตามลำดับ
+
+    ไฟล์ที่เนื้อหาเปลี่ยน (หรือ force) จะแทนที่ข้อมูลเดิมของไฟล์นั้นทั้งหมด
+    แถวที่ถูกแก้หรือลบในไฟล์ที่ส่งออกใหม่จึงไม่ค้างอยู่ในที่เก็บ
+    คืนค่า dict path -> จำนวนแถวใหม่ที่เขียน การเขียนเรียงตามลำดับของ file_paths
+    แถวที่ซ้ำกันข้ามไฟล์จึงถูกเก็บเพียงครั้งเดียว
+
+    ไฟล์ที่นำเข้าไม่ได้ได้ค่า None และถูกข้ามไป (ไฟล์อื่นนำเข้าตามปกติ) ข้อความ error
+    อ่านได้จาก import_errors() ไฟล์นี้จะไม่ถูกอ่านซ้ำจนกว่าไฟล์จะเปลี่ยน
+
+    retired คือไฟล์ต้นทางที่เลิกใช้แล้ว (เช่นไฟล์ตั้งต้นเมื่อมีไฟล์ Excel จริง):
+    ข้อมูลของไฟล์เหล่านี้ถูกลบออกจากที่เก็บ
+    """
+    rows_added = {file_path: 0 for file_path in file_paths}
+
+    with store_lock(store_path):
+        manifest = read_manifest(store_path)
+        if manifest.get("version") != MANIFEST_VERSION:
+            file_paths = _reset_legacy_store(manifest, file_paths, store_path, retired)
+            manifest = read_manifest(store_path)
+
+        failures = len(manifest.get("failed", {}))
+        pending = {}
+        for file_path in file_paths:
+            if not force and _failed_unchanged(manifest, file_path):
+                rows_added[file_path] = None
+                continue
+            try:
+                signature = _pending_signature(manifest, file_path, force)
+            except OSError as error:
+                rows_added[file_path] = None
+                _record_failure(manifest, file_path, error)
+                continue
+            if signature is not None:
+                pending[file_path] = signature
+
+        to_parse = []
+        for file_path, (_, _, sha256) in pending.items():
+            seen = manifest["sources"].get(os.path.abspath(file_path))
+            if force or not seen or seen.get("sha256") != sha256:
+                to_parse.append(file_path)
+
+        # ไฟล์ที่เนื้อหาไม่เปลี่ยน (mtime เปลี่ยนอย่างเดียว) บันทึกลายเซ็นใหม่โดยไม่อ่านไฟล์
+        for file_path in pending:
+            if file_path not in to_parse:
+                seen = manifest["sources"][os.path.abspath(file_path)]
+                _record_source(manifest, file_path, pending[file_path], 0, seen.get("rows_skipped", 0), seen.get("parts", []))
+        # ลบรายการไฟล์ที่นำเข้าไม่ได้ซึ่งถูกลบไปแล้ว
+        for path in [path for path in manifest.get("failed", {}) if not os.path.exists(path)]:
+            del manifest["failed"][path]
+        if len(pending) > len(to_parse) or len(manifest.get("failed", {})) != failures:
+            write_manifest(manifest, store_path)
+
+        # ลบข้อมูลของไฟล์ที่เลิกใช้ก่อน ไฟล์ที่เคยถูกข้ามแถวซ้ำกับไฟล์เหล่านี้จะถูกเขียนใหม่ด้านล่าง
+        retired = [os.path.abspath(file_path) for file_path in retired]
+        retired = [key for key in retired if key in manifest["sources"]]
+        refill = _sources_to_refill(manifest, to_parse + retired)
+        for key in retired:
+            delete_parts(manifest["sources"][key].get("parts", []), store_path)
+        for file_path, frame, error in _parse_files(to_parse + refill, max_workers):
+            if error is None:
+                try:
+                    signature = pending[file_path] if file_path in pending else file_signature(file_path)
+                except OSError as exc:
+                    error = exc
+            if error is not None:
+                _record_failure(manifest, file_path, error)
+                write_manifest(manifest, store_path)
+                if file_path in rows_added:
+                    rows_added[file_path] = None
+                continue
+            # บันทึกทีละไฟล์ หากไฟล์ถัดไปล้มเหลว ไฟล์ที่นำเข้าแล้วจะไม่ถูกอ่านซ้ำ
+            added = _replace_source(manifest, store_path, file_path, frame, signature)
+            if file_path in rows_added:
+                rows_added[file_path] = added
+
+        # ลบออกจาก manifest หลังเขียนใหม่ครบ หากหยุดกลางทาง รอบถัดไปจะทำซ้ำทั้งหมด
+        if retired:
+            for key in retired:
+                del manifest["sources"][key]
+            write_manifest(manifest, store_path)
+    return rows_added
+
+
+def list_parts(store_path=STORE_PATH):
+    """คืนรายการไฟล์ part ทั้งหมดในที่เก็บ (เรียงตาม path)"""
+    if not os.path.isdir(store_path):
+        return []
+    return sorted(open_dataset(store_path).files)
+
+
+def store_signature(store_path=STORE_PATH):
+    """ลายเซ็นของที่เก็บ: (path, mtime_ns, size) ของทุกไฟล์ part
+
+    ไฟล์ part ไม่ถูกแก้ไขหลังเขียน (การต่อท้ายสร้างไฟล์ใหม่ การแทนที่ลบไฟล์เดิม)
+    ลายเซ็นจึงเปลี่ยนก็ต่อเมื่อข้อมูลเปลี่ยนจริง
+    """
+    return tuple((part, *file_stat(part)) for part in list_parts(store_path))
+
+
+# (path, mtime_ns, size) -> จำนวนแถว ไฟล์ part ไม่ถูกแก้ไขหลังเขียน จึงนับเพียงครั้งเดียว
+_rows_memo = {}
+
+
+def signature_rows(signature):
+    """จำนวนแถวทั้งหมดของที่เก็บตามลายเซ็น (อ่านเฉพาะ metadata ของไฟล์ part ที่ยังไม่เคยนับ)"""
+    total = 0
+    for entry in signature:
+        if entry not in _rows_memo:
+            try:
+                _rows_memo[entry] = pq.ParquetFile(entry[0]).metadata.num_rows
+            except FileNotFoundError:
+                continue  # ถูกแทนที่ระหว่างนับ (ลายเซ็นถัดไปจะไม่มีไฟล์นี้)
+        total += _rows_memo[entry]
+    return total
+
+
+def group_batches(signature):
+    """จัดกลุ่มลายเซ็นตามชุดการนำเข้า (ไฟล์ part-<token>-*.parquet ที่เขียนพร้อมกัน)
+
+    คืนค่า tuple ของกลุ่ม เรียงตามลำดับที่พบ ใช้ประมวลผลทีละชุดนำเข้าแทนทีละไฟล์
+    เพราะแต่ละการนำเข้าแตกเป็นหลายพาร์ทิชัน (ไฟล์ละเดือน) ซึ่งเล็กเกินกว่าจะคุ้มค่าใช้จ่ายคงที่
+    """
+    batches = {}
+    for entry in signature:
+        batches.setdefault(part_token(entry[0]), []).append(entry)
+    return tuple(tuple(entries) for entries in batches.values())
+
+
+def read_parts(part_paths):
+    """อ่านไฟล์ part หลายไฟล์รวมกัน (เฉพาะคอลัมน์ข้อมูล)"""
+    table = ds.dataset(list(part_paths), format="parquet").to_table(columns=DATA_COLUMNS)
+    return table.to_pandas(strings_to_categorical=True)
+
+
+def read_store(store_path=STORE_PATH, columns=None):
+    """อ่านข้อมูลจากที่เก็บเฉพาะคอลัมน์ที่ต้องการ"""
+    if not store_exists(store_path):
+        return pd.DataFrame(columns=columns or DATA_COLUMNS)
+    table = open_dataset(store_path).to_table(columns=columns or DATA_COLUMNS)
+    # ข้อความซ้ำกันมาก (ชื่อ/แผนก/เวลา/ข้อยกเว้น) อ่านเป็น categorical ประหยัดหน่วยความจำ
+    return table.to_pandas(strings_to_categorical=True)
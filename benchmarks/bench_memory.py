@@ -0,0 +1,100 @@
+"""เทียบหน่วยความจำของข้อมูลหลังประมวลผล (แบบเดิม vs แบบกะทัดรัด) และต้นทุนของ cache hit
+
+- แบบเดิม: ข้อความเป็น object, เวลาเป็น datetime.time, ยอดการลาเป็น int64/float64
+- แบบกะทัดรัด: categorical, เวลาเป็นนาที int16, ยอดการลา float32, ไม่เก็บข้อความเวลาดิบ
+
+ต้นทุน cache hit: st.cache_data ต้อง unpickle สำเนาใหม่ให้ทุก session ทุกครั้ง
+ส่วน st.cache_resource คืนอ็อบเจกต์เดียวกันที่ใช้ร่วมกัน (อ่านอย่างเดียว)
+
+รัน:  python benchmarks/bench_memory.py --rows 1000000
+"""
+import argparse
+import logging
+import os
+import pickle
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import attendance_pipeline  # noqa: E402
+import bench_preprocess  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def frame_mb(frame):
+    return frame.memory_usage(deep=True).sum() / 2**20
+
+
+def column_report(legacy, compact):
+    rows = []
+    for col in legacy.columns.union(compact.columns, sort=False):
+        rows.append({
+            "คอลัมน์": col,
+            "แบบเดิม": str(legacy[col].dtype) if col in legacy else "-",
+            "แบบเดิม (MB)": legacy[col].memory_usage(deep=True, index=False) / 2**20 if col in legacy else 0.0,
+            "กะทัดรัด": str(compact[col].dtype) if col in compact else "(ตัดทิ้ง)",
+            "กะทัดรัด (MB)": compact[col].memory_usage(deep=True, index=False) / 2**20 if col in compact else 0.0,
+        })
+    return pd.DataFrame(rows)
+
+
+def hit_cost(cached_func, repeat):
+    """เวลาเฉลี่ยต่อ cache hit (เรียกครั้งแรกเป็น miss แล้วไม่นับ)"""
+    cached_func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        cached_func()
+    return (time.perf_counter() - start) / repeat
+
+
+def cache_costs(value, repeat):
+    import streamlit as st
+
+    # รันนอก streamlit run จะมีคำเตือนเรื่อง ScriptRunContext ซึ่งไม่เกี่ยวกับการวัด
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    @st.cache_data(show_spinner=False)
+    def data_cached():
+        return value
+
+    @st.cache_resource(show_spinner=False)
+    def resource_cached():
+        return value
+
+    return hit_cost(data_cached, repeat), hit_cost(resource_cached, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5, help="จำนวน cache hit ที่ใช้เฉลี่ย")
+    parser.add_argument("--skip-legacy", action="store_true", help="ไม่สร้างแบบเดิม (ช้ามากเมื่อข้อมูลใหญ่)")
+    args = parser.parse_args()
+
+    raw = synthetic.generate_attendance(args.rows)
+    compact, _ = attendance_pipeline.preprocess_and_calculate_summary(raw)
+    print(f"rows: {args.rows:,}")
+
+    if not args.skip_legacy:
+        legacy, _ = bench_preprocess.legacy_preprocess(raw)
+        with pd.option_context("display.float_format", "{:.2f}".format, "display.width", 200):
+            print(column_report(legacy, compact).to_string(index=False))
+        print(f"processed frame: {frame_mb(legacy):8.1f} MB -> {frame_mb(compact):8.1f} MB")
+        print(f"pickled size:    {len(pickle.dumps(legacy)) / 2**20:8.1f} MB -> {len(pickle.dumps(compact)) / 2**20:8.1f} MB")
+    else:
+        print(f"processed frame: {frame_mb(compact):8.1f} MB")
+
+    print("cache hit ต่อครั้ง (ต่อ session ต่อ rerun):")
+    outputs = attendance_pipeline.build_outputs([attendance_pipeline.summarize_batch(raw)])
+    for label, value in [("processed frame", compact), ("dashboard outputs", outputs)]:
+        data_s, resource_s = cache_costs(value, args.repeat)
+        print(f"  {label:<18} cache_data {data_s * 1000:9.2f} ms   cache_resource {resource_s * 1000:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
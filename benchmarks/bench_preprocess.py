@@ -0,0 +1,99 @@
+"""เทียบเวลาประมวลผลระหว่างขั้นตอนเดิม (apply ทีละแถว) กับ attendance_pipeline แบบ vectorized
+
+รัน:  python benchmarks/bench_preprocess.py --rows 1000000
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import attendance_pipeline  # noqa: E402
+import synthetic  # noqa: E402
+
+
+# ----------------------------------------------------------------------------------
+# ขั้นตอนเดิม (สำเนาจาก ncswtss.py ก่อนปรับเป็น vectorized) ใช้เป็นเส้นฐาน
+# errors='ignore' เปลี่ยนเป็น 'coerce' เพราะ pandas รุ่นใหม่ไม่รองรับแล้ว
+# ----------------------------------------------------------------------------------
+def legacy_parse_time(time_str):
+    try:
+        if pd.notna(time_str):
+            if isinstance(time_str, datetime.time):
+                return time_str
+            dt_obj = pd.to_datetime(str(time_str), format='%H:%M:%S', errors='coerce')
+            if not pd.isna(dt_obj):
+                return dt_obj.time()
+            dt_obj = pd.to_datetime(str(time_str), format='%H:%M', errors='coerce')
+            if not pd.isna(dt_obj):
+                return dt_obj.time()
+    except Exception:
+        pass
+    return None
+
+
+def legacy_preprocess(df):
+    df_base = df.copy()
+    for col in ["ชื่อ-สกุล", "แผนก", "ข้อยกเว้น"]:
+        df_base[col] = df_base[col].astype(object).astype(str).str.strip().str.replace(r"\s+", " ", regex=True)
+    df_base["แผนก"] = df_base["แผนก"].replace({"nan": "ไม่ระบุ", "": "ไม่ระบุ"})
+
+    df_base["วันที่"] = pd.to_datetime(df_base["วันที่"], errors='coerce')
+    df_base.dropna(subset=['วันที่'], inplace=True)
+    df_base["ปี"] = df_base["วันที่"].dt.year + 543
+    df_base["เดือน"] = df_base["วันที่"].dt.to_period("M")
+
+    df_base['เวลาเข้า'] = df_base['เข้างาน'].apply(legacy_parse_time)
+    df_base['เวลาออก'] = df_base['ออกงาน'].apply(legacy_parse_time)
+
+    def leave_days(row):
+        if "ครึ่งวัน" in str(row):
+            return 0.5
+        return 1
+
+    df_base["ลาป่วย/ลากิจ"] = df_base["ข้อยกเว้น"].apply(
+        lambda x: leave_days(x) if str(x) in ["ลาป่วย", "ลากิจ", "ลาป่วยครึ่งวัน", "ลากิจครึ่งวัน"] else 0
+    )
+    df_base["ขาด"] = df_base["ข้อยกเว้น"].apply(
+        lambda x: leave_days(x) if str(x) in ["ขาด", "ขาดครึ่งวัน"] else 0
+    )
+    df_base["สาย"] = df_base["ข้อยกเว้น"].apply(lambda x: 1 if str(x) == "สาย" else 0)
+
+    leave_types = ["ลาป่วย/ลากิจ", "ขาด", "สาย"]
+    summary = df_base.groupby(["ชื่อ-สกุล", "แผนก"])[leave_types].sum().reset_index()
+    return df_base, summary
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    df = synthetic.generate_attendance(args.rows)
+    (_, legacy_summary), legacy_s = timed(legacy_preprocess, df)
+    (_, summary), vectorized_s = timed(attendance_pipeline.preprocess_and_calculate_summary, df)
+
+    # ชื่อ/แผนกของแบบใหม่เป็น categorical เทียบค่าเป็นข้อความ
+    summary = summary.astype({"ชื่อ-สกุล": str, "แผนก": str})
+    pd.testing.assert_frame_equal(
+        legacy_summary, summary, check_dtype=False, check_index_type=False, check_column_type=False
+    )
+
+    print(f"rows:        {args.rows:,}")
+    print(f"legacy:      {legacy_s:8.3f} s")
+    print(f"vectorized:  {vectorized_s:8.3f} s")
+    print(f"speedup:     {legacy_s / vectorized_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""ตรวจการนำเข้าไฟล์ต้นทางซ้ำในที่เก็บ Parquet (ใช้โฟลเดอร์ชั่วคราว ไม่แตะที่เก็บจริง)
+
+- ไฟล์ที่ส่งออกใหม่โดยแก้ข้อยกเว้นของวันเดิม ต้องเปลี่ยนสรุป (ไม่เหลือค่าเก่าคู่กับค่าใหม่)
+- แถวที่ถูกลบออกจากไฟล์ต้องหายจากที่เก็บ และ Refresh (force) ต้องไม่ทำให้ยอดเปลี่ยน
+- แถวที่ซ้ำข้ามไฟล์เก็บครั้งเดียว และยังอยู่เมื่อไฟล์ที่เก็บแถวนั้นไว้ถูกแก้
+- หลาย process นำเข้าไฟล์ใหม่พร้อมกัน (แดชบอร์ดกับ cron) ต้องไม่เขียนแถวซ้ำ
+- ไฟล์ที่เสียหนึ่งไฟล์ต้องไม่หยุดการนำเข้าไฟล์อื่น และไม่ถูกอ่านซ้ำจนกว่าจะเปลี่ยน
+- ไฟล์ Parquet ตั้งต้นใช้เฉพาะเมื่อยังไม่มีไฟล์ Excel และไม่นับคู่กับแถวที่แก้ใน Excel
+
+รัน:  python benchmarks/check_store.py
+"""
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import attendance_pipeline  # noqa: E402
+import attendance_store  # noqa: E402
+
+
+def day(name, date, exception, department="บัญชี"):
+    return {
+        "ชื่อ-สกุล": name, "แผนก": department, "วันที่": pd.Timestamp(date),
+        "เข้างาน": None, "ออกงาน": None, "ข้อยกเว้น": exception,
+    }
+
+
+def export(path, rows):
+    """เขียนไฟล์ส่งออกใหม่ (เลื่อน mtime ให้ต่างจากครั้งก่อนแน่นอน)"""
+    pd.DataFrame(rows, columns=attendance_store.DATA_COLUMNS).to_excel(path, index=False)
+    stamp = time.time_ns() + 1_000_000_000
+    os.utime(path, ns=(stamp, stamp))
+
+
+def totals(store_path):
+    summary, _, _ = attendance_pipeline.process_store(store_path)
+    rows = summary.set_index("ชื่อ-สกุล")[attendance_pipeline.LEAVE_TYPES].astype(float)
+    return {name: values.to_dict() for name, values in rows.iterrows()}
+
+
+def check(label, actual, expected):
+    assert actual == expected, f"{label}: ได้ {actual} ต้องการ {expected}"
+    print(f"OK  {label}")
+
+
+def import_in_process(file_path, store_path):
+    return attendance_store.import_files([file_path], store_path)[file_path]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp, "store")
+        branch_a = os.path.join(tmp, "branch_a.xlsx")
+        branch_b = os.path.join(tmp, "branch_b.xlsx")
+
+        # ไฟล์เดียว: ส่งออกครั้งแรกเป็นขาด แล้วแก้เป็นลาป่วย
+        export(branch_a, [day("ก", "2025-01-06", "ขาด")])
+        attendance_store.import_files([branch_a], store)
+        check("นำเข้าครั้งแรก", totals(store)["ก"], {"ลาป่วย/ลากิจ": 0.0, "ขาด": 1.0, "สาย": 0.0})
+
+        export(branch_a, [day("ก", "2025-01-06", "ลาป่วย")])
+        attendance_store.import_files([branch_a], store)
+        check("แก้ไขแล้วส่งออกใหม่", totals(store)["ก"], {"ลาป่วย/ลากิจ": 1.0, "ขาด": 0.0, "สาย": 0.0})
+
+        attendance_store.import_files([branch_a], store, force=True)
+        check("Refresh (force)", totals(store)["ก"], {"ลาป่วย/ลากิจ": 1.0, "ขาด": 0.0, "สาย": 0.0})
+
+        export(branch_a, [day("ก", "2025-01-06", "ลาป่วย"), day("ก", "2025-01-07", "สาย")])
+        attendance_store.import_files([branch_a], store)
+        export(branch_a, [day("ก", "2025-01-06", "ลาป่วย")])
+        attendance_store.import_files([branch_a], store)
+        check("ลบแถวออกจากไฟล์", totals(store)["ก"], {"ลาป่วย/ลากิจ": 1.0, "ขาด": 0.0, "สาย": 0.0})
+
+        # สองสาขามีแถวเดียวกัน: เก็บครั้งเดียว และยังอยู่เมื่อสาขาแรกตัดแถวนั้นออก
+        shared = day("ข", "2025-01-08", "ขาด", "ขาย")
+        export(branch_a, [day("ก", "2025-01-06", "ลาป่วย"), shared])
+        export(branch_b, [shared, day("ข", "2025-01-09", "สาย", "ขาย")])
+        attendance_store.import_files([branch_a, branch_b], store)
+        check("แถวซ้ำข้ามไฟล์", totals(store)["ข"], {"ลาป่วย/ลากิจ": 0.0, "ขาด": 1.0, "สาย": 1.0})
+
+        export(branch_a, [day("ก", "2025-01-06", "ลาป่วย")])
+        attendance_store.import_files([branch_a, branch_b], store)
+        check("แถวซ้ำหลังไฟล์แรกตัดออก", totals(store)["ข"], {"ลาป่วย/ลากิจ": 0.0, "ขาด": 1.0, "สาย": 1.0})
+        check("จำนวนแถวในที่เก็บ", len(attendance_store.read_store(store)), 3)
+
+        # หลาย process เห็นไฟล์ใหม่พร้อมกัน: ต้องมี process เดียวที่เขียน
+        concurrent_store = os.path.join(tmp, "concurrent")
+        export(branch_a, [day("ค", f"2025-02-{d:02d}", "ขาด") for d in range(1, 21)])
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(4, mp_context=context) as pool:
+            added = list(pool.map(import_in_process, [branch_a] * 4, [concurrent_store] * 4))
+        check("นำเข้าพร้อมกันหลาย process", sorted(added), [0, 0, 0, 20])
+        check("จำนวนแถวหลังนำเข้าพร้อมกัน", len(attendance_store.read_store(concurrent_store)), 20)
+
+        # ไฟล์เสียเรียงก่อนไฟล์ดี: ทั้งแบบ process pool และแบบทีละไฟล์
+        for workers in (2, 1):
+            bad_store = os.path.join(tmp, f"bad_{workers}")
+            branches = [os.path.join(tmp, f"bad_{workers}_{name}.xlsx") for name in ("a", "b", "c", "d")]
+            with open(branches[0], "wb") as f:
+                f.write(b"not a workbook")
+            for i, path in enumerate(branches[1:]):
+                export(path, [day(f"สาขา{i}", "2025-03-03", "ขาด")])
+            results = attendance_store.import_files(branches, bad_store, max_workers=workers)
+            check(f"ข้ามไฟล์เสีย (workers={workers})", list(results.values()), [None, 1, 1, 1])
+            check(f"แจ้งไฟล์เสีย (workers={workers})", list(attendance_store.import_errors(bad_store)), [branches[0]])
+            check(
+                f"ไม่อ่านไฟล์เสียซ้ำ (workers={workers})",
+                list(attendance_store.import_files(branches, bad_store, max_workers=workers).values()),
+                [None, 0, 0, 0],
+            )
+            export(branches[0], [day("สาขาใหม่", "2025-03-03", "สาย")])
+            results = attendance_store.import_files(branches, bad_store, max_workers=workers)
+            check(f"นำเข้าเมื่อแก้ไฟล์แล้ว (workers={workers})", list(results.values()), [1, 0, 0, 0])
+            check(f"ไม่มีไฟล์ค้าง (workers={workers})", attendance_store.import_errors(bad_store), {})
+
+        # ไฟล์ตั้งต้น: ที่เก็บเริ่มจาก Parquet แล้ว Excel ที่แก้ขาดเป็นลาป่วยมาแทน
+        seed_store = os.path.join(tmp, "seed")
+        seed = os.path.join(tmp, "seed.parquet")
+        workbook = os.path.join(tmp, "workbook.xlsx")
+        rows = [day("ง", "2025-04-01", "ขาด"), day("ง", "2025-04-02", "สาย")]
+        pd.DataFrame(rows, columns=attendance_store.DATA_COLUMNS).to_parquet(seed)
+        attendance_pipeline.sync_sources([workbook], seed_store, seed_sources=[seed])
+        check("ตั้งต้นจาก Parquet", totals(seed_store)["ง"], {"ลาป่วย/ลากิจ": 0.0, "ขาด": 1.0, "สาย": 1.0})
+
+        export(workbook, [day("ง", "2025-04-01", "ลาป่วย"), day("ง", "2025-04-02", "สาย")])
+        attendance_pipeline.sync_sources([workbook], seed_store, seed_sources=[seed])
+        check("Excel แทนไฟล์ตั้งต้น", totals(seed_store)["ง"], {"ลาป่วย/ลากิจ": 1.0, "ขาด": 0.0, "สาย": 1.0})
+        check("ไม่เหลือไฟล์ตั้งต้นใน manifest", list(attendance_store.read_manifest(seed_store)["sources"]), [workbook])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""ชุดวัดประสิทธิภาพของ pipeline แดชบอร์ด ตามขนาดข้อมูลต่าง ๆ
+
+วัดเวลาและหน่วยความจำสูงสุด (tracemalloc + หน่วยความจำของ Arrow) ของแต่ละขั้น:
+import, load_data, preprocess, build_outputs, lazy_build_cube (cube ของโหมด lazy ด้วย query บนที่เก็บ),
+filter_rollup, ranking (ทั้งตาราง / 20 อันดับแรก)
+แล้วบันทึกผลเป็น JSON เพื่อเทียบหา regression กับผลครั้งก่อน
+
+รัน:  python benchmarks/run_benchmarks.py --rows 10000 100000 1000000
+      python benchmarks/run_benchmarks.py --rows 100000 --compare benchmarks/results/baseline.json
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import attendance_pipeline  # noqa: E402
+import attendance_query  # noqa: E402
+import attendance_store  # noqa: E402
+import synthetic  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+# ----------------------------------------------------------------------------------
+# การวัด
+# ----------------------------------------------------------------------------------
+class ArrowPeakSampler:
+    """สุ่มอ่าน pa.total_allocated_bytes() เป็นระยะใน thread แยก เก็บค่าสูงสุดเหนือค่าตั้งต้น"""
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, pa.total_allocated_bytes() - self._baseline)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._baseline = pa.total_allocated_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, pa.total_allocated_bytes() - self._baseline)
+
+
+def measure(func, repeat=1, memory=True):
+    """คืนค่า (ผลลัพธ์, เวลาที่ดีที่สุด (วินาที), หน่วยความจำสูงสุด (MB) หรือ None)"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak_mb = None
+    if memory:
+        # รอบแยกสำหรับวัดหน่วยความจำ เพราะ tracemalloc ทำให้โค้ด Python ช้าลง
+        # หน่วยความจำของ Arrow ไม่ผ่าน tracemalloc จึงสุ่มอ่านยอดจัดสรรของ Arrow แยกแล้วรวมกัน
+        del result
+        gc.collect()
+        with ArrowPeakSampler() as arrow_peak:
+            tracemalloc.start()
+            try:
+                result = func()
+                python_peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        peak_mb = (python_peak + arrow_peak.peak) / 2**20
+    return result, best, peak_mb
+
+
+def frame_rows(result):
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    if isinstance(result, tuple):
+        return sum(len(item) for item in result if isinstance(item, pd.DataFrame))
+    return None
+
+
+def filter_combinations(cube):
+    """ชุดตัวกรองตัวอย่าง: ทั้งหมด / ปี / ปี+เดือน / ปี+เดือน+แผนก (เหมือน selectbox ในแดชบอร์ด)"""
+    year = cube["ปี"].max()
+    month = cube.loc[cube["ปี"] == year, "เดือน"].max()
+    department = cube["แผนก"].iloc[0]
+    return [
+        {},
+        {"year": year},
+        {"year": year, "month": month},
+        {"year": year, "month": month, "department": department},
+    ]
+
+
+def filter_rollup(cube):
+    return [
+        attendance_pipeline.rollup_summary(attendance_pipeline.filter_rows(cube, **filters))
+        for filters in filter_combinations(cube)
+    ]
+
+
+def rankings(summary, top_n=None):
+    return tuple(attendance_pipeline.build_ranking(summary, leave, top_n) for leave in attendance_pipeline.LEAVE_TYPES)
+
+
+# ----------------------------------------------------------------------------------
+# ชุดวัด
+# ----------------------------------------------------------------------------------
+def run_size(n_rows, workdir, repeat=1, memory=True, excel_max_rows=50_000, seed=0):
+    results = []
+
+    def record(stage, func, rows_in, stage_repeat=repeat):
+        result, seconds, peak_mb = measure(func, stage_repeat, memory)
+        entry = {
+            "rows": n_rows,
+            "stage": stage,
+            "seconds": round(seconds, 6),
+            "peak_mb": None if peak_mb is None else round(peak_mb, 2),
+            "rows_in": rows_in,
+            "rows_out": frame_rows(result),
+        }
+        results.append(entry)
+        peak = "-" if peak_mb is None else f"{peak_mb:9.1f} MB"
+        print(f"{n_rows:>12,}  {stage:<18} {seconds:9.3f} s  {peak}")
+        return result
+
+    source = synthetic.write_attendance(os.path.join(workdir, f"synthetic-{n_rows}.parquet"), n_rows, seed=seed)
+    store_path = os.path.join(workdir, f"store-{n_rows}")
+
+    def import_source():
+        shutil.rmtree(store_path, ignore_errors=True)
+        return attendance_store.import_file(source, store_path)
+
+    record("import", import_source, n_rows, stage_repeat=1)
+
+    if n_rows <= excel_max_rows:
+        excel_source = synthetic.write_attendance(os.path.join(workdir, f"synthetic-{n_rows}.xlsx"), n_rows, seed=seed)
+        record("read_excel", lambda: attendance_store.read_source_file(excel_source), n_rows, stage_repeat=1)
+
+    def load_raw():
+        return attendance_pipeline.load_data(sources=[], store_path=store_path, seed_sources=[])
+
+    raw = record("load_data", load_raw, n_rows)
+    record("preprocess", lambda: attendance_pipeline.preprocess_and_calculate_summary(raw), len(raw))
+    summary, cube, _ = record("build_outputs", lambda: attendance_pipeline.process_store(store_path), len(raw))
+    # โหมด lazy สร้าง cube ด้วยการรวมยอดบนที่เก็บแทน build_outputs ส่วนตัวกรองใช้ filter_rollup เหมือนกัน
+    record("lazy_build_cube", lambda: attendance_query.query_cube(store_path), n_rows)
+    record("filter_rollup", lambda: filter_rollup(cube), len(cube))
+    record("ranking", lambda: rankings(summary), len(summary))
+    record("ranking_top20", lambda: rankings(summary, top_n=20), len(summary))
+    return results
+
+
+def environment():
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    """เทียบกับผลครั้งก่อน คืนรายการขั้นที่ช้าลง/ใช้หน่วยความจำเพิ่มเกิน tolerance"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(entry["rows"], entry["stage"]): entry for entry in json.load(f)["results"]}
+
+    regressions = []
+    for entry in results:
+        previous = baseline.get((entry["rows"], entry["stage"]))
+        if previous is None:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            before, after = previous.get(metric), entry.get(metric)
+            if before and after and after > before * (1 + tolerance):
+                regressions.append(
+                    f"{entry['rows']:,} {entry['stage']} {metric}: {before:.3f} -> {after:.3f} (+{after / before - 1:.0%})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3, help="จำนวนรอบจับเวลา (ใช้เวลาที่ดีที่สุด)")
+    parser.add_argument("--no-memory", action="store_true", help="ไม่วัดหน่วยความจำ (เร็วขึ้นสำหรับข้อมูลขนาดใหญ่)")
+    parser.add_argument("--excel-max-rows", type=int, default=50_000, help="วัดการอ่าน Excel เฉพาะขนาดไม่เกินค่านี้")
+    parser.add_argument("--out", default=None, help="ไฟล์ JSON ผลลัพธ์ (ค่าเริ่มต้น benchmarks/results/<เวลา>.json)")
+    parser.add_argument("--compare", default=None, help="ไฟล์ JSON ผลครั้งก่อนสำหรับตรวจ regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="สัดส่วนที่ยอมให้ช้าลงได้ก่อนนับเป็น regression")
+    args = parser.parse_args()
+
+    results = []
+    workdir = tempfile.mkdtemp(prefix="attendance-bench-")
+    try:
+        for n_rows in args.rows:
+            results.extend(run_size(n_rows, workdir, args.repeat, not args.no_memory, args.excel_max_rows))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    out_path = args.out or os.path.join(
+        RESULTS_DIR, f"bench-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"บันทึกผลที่ {out_path}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""สร้างข้อมูลการลงเวลาสังเคราะห์ตามโครงสร้างของ attendances.xlsx
+
+ข้อมูลมีทั้งเวลาแบบ H:M และ H:M:S, ช่องว่างหัวท้าย, ชั่วโมงหลักเดียว, ค่าว่าง
+และค่าที่อ่านไม่ได้ ให้ใกล้เคียงข้อมูลจริงที่ส่งออกจากเครื่องสแกน
+
+รัน:  python benchmarks/synthetic.py --rows 1000000 --out synthetic.parquet
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+COLUMNS = ["ชื่อ-สกุล", "แผนก", "วันที่", "เข้างาน", "ออกงาน", "ข้อยกเว้น"]
+
+# สัดส่วนข้อยกเว้นใกล้เคียงกับ attendances.parquet
+EXCEPTIONS = {
+    "-": 0.65,
+    "วันหยุด": 0.18,
+    "ลาป่วย": 0.028,
+    "ลาพักผ่อน": 0.019,
+    "สาย": 0.018,
+    "ขาด": 0.015,
+    "อนุญาต": 0.013,
+    "ลาป่วยครึ่งวัน": 0.011,
+    "ไปงานศพ": 0.008,
+    "บันทึกลืมสแกน": 0.008,
+    "ขาดครึ่งวัน": 0.005,
+    "บันทึกสแกนไม่ผ่าน": 0.005,
+    "งานนอกสถานที่": 0.005,
+    "ลากิจ": 0.003,
+    "ลากิจครึ่งวัน": 0.002,
+}
+
+N_DEPARTMENTS = 25
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+def format_times(minutes, rng, messy=True):
+    """แปลงนาทีของวันเป็นข้อความเวลา ผสมรูปแบบ H:M / H:M:S และค่าเลอะเทอะ"""
+    hours = (minutes // 60).astype(str)
+    mins = pd.Series(minutes % 60).astype(str).str.zfill(2)
+    padded = pd.Series(hours).str.zfill(2)
+
+    style = rng.random(len(minutes))
+    text = np.where(style < 0.5, padded + ":" + mins + ":00", padded + ":" + mins).astype(object)
+    if messy:
+        unpadded = style > 0.97
+        text[unpadded] = (pd.Series(hours[unpadded]) + ":" + mins[unpadded].to_numpy()).to_numpy()
+        spaced = (style > 0.95) & (style <= 0.97)
+        text[spaced] = " " + text[spaced] + " "
+        text[(style > 0.94) & (style <= 0.95)] = "--:--"
+        text[rng.random(len(minutes)) < 0.08] = None
+    return text
+
+
+def generate_chunk(n_rows, n_employees, start, days, rng, messy=True):
+    employees = np.array([f"พนักงาน{i:06d} ทดสอบ" for i in range(n_employees)], dtype=object)
+    departments = np.array([f"สำนักทดสอบ {i % N_DEPARTMENTS:02d}" for i in range(n_employees)], dtype=object)
+    who = rng.integers(0, n_employees, n_rows)
+
+    names = employees[who]
+    if messy:
+        # ชื่อที่มีช่องว่างซ้ำ/หัวท้าย ต้องถูกรวมเป็นคนเดียวกันหลังทำความสะอาด
+        dirty = rng.random(n_rows) < 0.01
+        names = names.copy()
+        names[dirty] = [f" {name.replace(' ', '  ')} " for name in names[dirty]]
+
+    exception_names = np.array(list(EXCEPTIONS), dtype=object)
+    probabilities = np.array(list(EXCEPTIONS.values()))
+    exceptions = rng.choice(exception_names, n_rows, p=probabilities / probabilities.sum())
+
+    return pd.DataFrame({
+        "ชื่อ-สกุล": names,
+        "แผนก": departments[who],
+        "วันที่": start + pd.to_timedelta(rng.integers(0, days, n_rows), unit="D"),
+        "เข้างาน": format_times(rng.integers(6 * 60, 10 * 60, n_rows), rng, messy),
+        "ออกงาน": format_times(rng.integers(15 * 60, 19 * 60, n_rows), rng, messy),
+        "ข้อยกเว้น": exceptions,
+    })[COLUMNS]
+
+
+def iter_attendance(n_rows, n_employees=None, years=5, seed=0, messy=True, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """สร้างข้อมูลทีละ chunk (ไม่ต้องถือทั้งชุดในหน่วยความจำ)
+
+    ค่าเริ่มต้นคือจำนวนพนักงานที่ทำให้แต่ละคนมีราว 250 วันทำงานต่อปี
+    """
+    rng = np.random.default_rng(seed)
+    n_employees = n_employees or max(10, n_rows // (250 * years))
+    start = pd.Timestamp("2020-01-01")
+    days = 365 * years
+    for offset in range(0, n_rows, chunk_rows):
+        yield generate_chunk(min(chunk_rows, n_rows - offset), n_employees, start, days, rng, messy)
+
+
+def generate_attendance(n_rows, **kwargs):
+    """สร้างข้อมูลสังเคราะห์ n_rows แถวเป็น DataFrame เดียว"""
+    return pd.concat(iter_attendance(n_rows, **kwargs), ignore_index=True)
+
+
+def write_attendance(path, n_rows, **kwargs):
+    """เขียนข้อมูลสังเคราะห์ลงไฟล์ (.parquet เขียนทีละ chunk, .xlsx เขียนทั้งชุด)"""
+    if path.lower().endswith(".xlsx"):
+        generate_attendance(n_rows, **kwargs).to_excel(path, index=False)
+        return path
+
+    writer = None
+    try:
+        for chunk in iter_attendance(n_rows, **kwargs):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--employees", type=int, default=None)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clean", action="store_true", help="ไม่ใส่ค่าเวลา/ชื่อที่เลอะเทอะ")
+    parser.add_argument("--out", default="synthetic_attendances.parquet")
+    args = parser.parse_args()
+
+    write_attendance(
+        args.out, args.rows, n_employees=args.employees, years=args.years, seed=args.seed, messy=not args.clean
+    )
+    print(f"เขียน {args.rows:,} แถวที่ {args.out}")
+
+
+if __name__ == "__main__":
+    main()
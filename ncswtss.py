@@ -1,13 +1,22 @@
 import streamlit as st
-import pandas as pd
-import altair as alt
 import datetime
 import os
+import uuid
 import pytz # สำหรับโซนเวลา
 
+import attendance_cache
+import attendance_charts
+import attendance_pipeline
+import attendance_profiling
+import attendance_query
+import attendance_store
+
 # ----------------------------------------------------------------------------------
 # ตั้งค่าหน้า และ CSS
 # ----------------------------------------------------------------------------------
+# ผลลัพธ์ในแคชร่วมถูกอ่านพร้อมกันหลาย session ต้องเปิด Copy-on-Write ก่อนประมวลผลใดๆ
+attendance_cache.enable_copy_on_write()
+
 st.set_page_config(page_title="HR Dashboard", layout="wide")
 st.title("📊 แดชบอร์ดการลา / ขาด / สาย")
 st.markdown("""
@@ -72,106 +81,198 @@ def format_thai_month(period):
     month = thai_months[period.month - 1]
     return f"{month} {year}"
 
-def parse_time(time_str):
-    """พยายามแปลง string หรือ datetime.time ให้เป็น datetime.time object"""
-    try:
-        if pd.notna(time_str):
-            if isinstance(time_str, datetime.time):
-                return time_str
-            # ลองแปลงเป็น H:M:S
-            dt_obj = pd.to_datetime(str(time_str), format='%H:%M:%S', errors='ignore')
-            if not pd.isna(dt_obj):
-                return dt_obj.time()
-    except:
-        try:
-            # ลองแปลงเป็น H:M
-            dt_obj = pd.to_datetime(str(time_str), format='%H:%M', errors='ignore')
-            if not pd.isna(dt_obj):
-                return dt_obj.time()
-        except:
-            pass
-    return None
+DETAIL_PAGE_SIZE = int(os.environ.get("ATTENDANCE_DETAIL_PAGE_SIZE", "50"))  # จำนวนรายการต่อหน้าในรายละเอียดวันลา
+TABLE_PAGE_SIZES = [10, 20, 50, 100]
+TABLE_TOP_N = int(os.environ.get("ATTENDANCE_TABLE_TOP_N", "20"))  # จำนวนแถวต่อหน้าเริ่มต้นของตารางสรุป/อันดับ
+
+def page_controls(total, key):
+    """ตัวเลือกจำนวนแถวต่อหน้าและหน้าที่แสดง คืน (offset, page_size) เพื่อส่งไปเบราว์เซอร์เฉพาะหน้านั้น"""
+    sizes = sorted(set(TABLE_PAGE_SIZES + [TABLE_TOP_N]))
+    if total <= sizes[0]:
+        return 0, total
+    col_size, col_page = st.columns(2)
+    page_size = col_size.selectbox("จำนวนต่อหน้า", sizes, index=sizes.index(TABLE_TOP_N), key=f"page_size|{key}")
+    pages = -(-total // page_size)
+    page = col_page.number_input(f"หน้า (ทั้งหมด {pages:,} หน้า, {total:,} รายการ)", min_value=1, step=1, key=f"page|{key}")
+    return (min(page, pages) - 1) * page_size, page_size
+
+
+def format_detail_rows(dates):
+    """สร้าง HTML รายละเอียดวันลาทั้งรายการในครั้งเดียว (ไม่วนทีละแถว)"""
+    # ลา/ขาดเต็มวันแสดงช่วงเวลาเป็น 00:00 - 00:00
+    full_day = dates["ข้อยกเว้น"].isin(["ลาป่วย", "ลากิจ", "ขาด"]).to_numpy()
+    time_period = (
+        attendance_pipeline.format_minutes(dates["เวลาเข้า"]) + " - " + attendance_pipeline.format_minutes(dates["เวลาออก"])
+    ).where(~full_day, "00:00 - 00:00")
+
+    lines = (
+        "<div style='margin-bottom: 5px; font-size: 16px;'>• "
+        + dates["วันที่"].dt.strftime("%d/%m/%Y")
+        + "&nbsp;&nbsp;&nbsp;&nbsp;" + time_period
+        + "&nbsp;&nbsp;&nbsp;&nbsp;" + dates["ข้อยกเว้น"].astype(str)
+        + "</div>"
+    )
+    return "".join(lines)
 
 # ----------------------------------------------------------------------------------
-# โหลดไฟล์ Excel (Caching Level 1)
+# จับเวลาแต่ละขั้นของ rerun นี้ (แสดงในแถบข้างสำหรับผู้ดูแล และบันทึกลงไฟล์ log)
 # ----------------------------------------------------------------------------------
-@st.cache_data(ttl=300, show_spinner="⏳ กำลังโหลดไฟล์ข้อมูล...")
-def load_data(file_path="attendances.xlsx"):
-    try:
-        if file_path and os.path.exists(file_path):
-            df = pd.read_excel(file_path, engine='openpyxl', dtype={'เข้างาน': str, 'ออกงาน': str})
-            return df
-        else:
-            st.warning("❌ ไม่พบไฟล์ Excel: attendances.xlsx")
-            return pd.DataFrame()
-    except Exception as e:
-        st.error(f"❌ อ่านไฟล์ Excel ไม่ได้: {e}")
-        return pd.DataFrame()
+PROFILE_LOG_PATH = os.environ.get("ATTENDANCE_PROFILE_LOG", attendance_profiling.PROFILE_LOG_PATH)  # "" = ไม่บันทึก
+PROFILE_LOG_MAX_MB = float(os.environ.get("ATTENDANCE_PROFILE_LOG_MB", attendance_profiling.PROFILE_LOG_MAX_MB))
+show_admin_panel = os.environ.get("ATTENDANCE_ADMIN") == "1" or st.query_params.get("admin") == "1"
 
-df_raw = load_data()
+if "profile_session_id" not in st.session_state:
+    st.session_state.profile_session_id = uuid.uuid4().hex
+profile = attendance_profiling.RunProfile(st.session_state.profile_session_id)
 
 # ----------------------------------------------------------------------------------
-# ประมวลผลและคำนวณสรุปทั้งหมด (Caching Level 2: ส่วนสำคัญที่ทำให้เร็วขึ้นมาก)
+# นำเข้าไฟล์ต้นทางและตรวจการเปลี่ยนแปลงของที่เก็บ Parquet
 # ----------------------------------------------------------------------------------
-@st.cache_data(ttl=3600, show_spinner="⚙️ กำลังประมวลผลข้อมูลและคำนวณสรุป...")
-def preprocess_and_calculate_summary(df):
-    if df.empty:
-        return pd.DataFrame(), pd.DataFrame()
-
-    df_base = df.copy()
+STORE_PATH = attendance_store.STORE_PATH
+# ไฟล์/โฟลเดอร์/glob ของไฟล์ต้นทาง คั่นด้วย os.pathsep (":" บน Linux, ";" บน Windows)
+SOURCES = os.environ.get("ATTENDANCE_SOURCES", os.pathsep.join(attendance_pipeline.DEFAULT_SOURCES)).split(os.pathsep)
+WATCH_INTERVAL_SECONDS = int(os.environ.get("ATTENDANCE_WATCH_SECONDS", "60"))  # 0 = ปิดการตรวจไฟล์อัตโนมัติ
 
-    # --- การเตรียมข้อมูลเบื้องต้น ---
-    for col in ["ชื่อ-สกุล", "แผนก", "ข้อยกเว้น"]:
-        if col in df_base.columns:
-            df_base[col] = df_base[col].astype(str).str.strip().str.replace(r"\s+", " ", regex=True)
+def sync_data():
+    """นำเข้าไฟล์ต้นทางที่เปลี่ยน แล้วคืนลายเซ็นของที่เก็บ (ใช้เป็น cache key แทน TTL)
 
-    if "แผนก" in df_base.columns:
-        df_base["แผนก"] = df_base["แผนก"].replace({"nan": "ไม่ระบุ", "": "ไม่ระบุ"})
-
-    if "วันที่" in df_base.columns:
-        df_base["วันที่"] = pd.to_datetime(df_base["วันที่"], errors='coerce')
-        df_base.dropna(subset=['วันที่'], inplace=True)
-        if df_base.empty: return pd.DataFrame(), pd.DataFrame() # เช็คซ้ำหลัง dropna
-        
-        df_base["ปี"] = df_base["วันที่"].dt.year + 543
-        df_base["เดือน"] = df_base["วันที่"].dt.to_period("M")
-    
-    # แปลงเวลาเข้า/ออก
-    if 'เข้างาน' in df_base.columns:
-        df_base['เวลาเข้า'] = df_base['เข้างาน'].apply(parse_time)
-    
-    if 'ออกงาน' in df_base.columns:
-        df_base['เวลาออก'] = df_base['ออกงาน'].apply(parse_time)
-
-    # --- คำนวณประเภทการลา ---
-    def leave_days(row):
-        """คำนวณจำนวนวันลา (1 วันเต็ม หรือ 0.5 วัน)"""
-        if "ครึ่งวัน" in str(row):
-            return 0.5
-        return 1
-
-    df_base["ลาป่วย/ลากิจ"] = df_base["ข้อยกเว้น"].apply(
-        lambda x: leave_days(x) if str(x) in ["ลาป่วย", "ลากิจ", "ลาป่วยครึ่งวัน", "ลากิจครึ่งวัน"] else 0
-    )
-    df_base["ขาด"] = df_base["ข้อยกเว้น"].apply(
-        lambda x: leave_days(x) if str(x) in ["ขาด", "ขาดครึ่งวัน"] else 0
+    ไฟล์ที่ mtime/ขนาด/hash ไม่เปลี่ยนจะไม่ถูกอ่านซ้ำ การเรียกทุก rerun จึงเหลือแค่ stat ไฟล์
+    """
+    try:
+        return attendance_pipeline.sync_sources(SOURCES, STORE_PATH)
+    except Exception as e:
+        st.error(f"❌ อ่านไฟล์ข้อมูลไม่ได้: {e}")
+        return attendance_store.store_signature(STORE_PATH)
+
+with profile.stage("load") as stage:
+    store_signature = sync_data()
+    stage["rows_out"] = attendance_store.signature_rows(store_signature)  # จำนวนแถวในที่เก็บ
+if not store_signature:
+    st.warning("❌ ไม่พบไฟล์ Excel: attendances.xlsx")
+
+# ไฟล์ที่อ่านไม่ได้ถูกข้าม (ไฟล์อื่นนำเข้าตามปกติ) และจะไม่ถูกอ่านซ้ำจนกว่าไฟล์จะเปลี่ยน
+import_errors = attendance_store.import_errors(STORE_PATH)
+if import_errors:
+    st.warning(
+        "⚠️ นำเข้าไฟล์ต่อไปนี้ไม่สำเร็จ (ข้อมูลจากไฟล์อื่นแสดงตามปกติ):\n\n"
+        + "\n".join(f"- `{path}`: {error}" for path, error in import_errors.items())
     )
-    df_base["สาย"] = df_base["ข้อยกเว้น"].apply(lambda x: 1 if str(x) == "สาย" else 0)
 
-    # 3 ประเภทหลัก
-    leave_types = ["ลาป่วย/ลากิจ", "ขาด", "สาย"] 
-    summary = df_base.groupby(["ชื่อ-สกุล", "แผนก"])[leave_types].sum().reset_index()
-
-    return df_base, summary
+# ----------------------------------------------------------------------------------
+# ประมวลผลและคำนวณสรุปทั้งหมด (Caching: key คือลายเซ็นไฟล์ ไม่ใช่เวลา)
+# ----------------------------------------------------------------------------------
+# "memory" = ประมวลผลทั้งชุดไว้ในหน่วยความจำ, "lazy" = รวมยอดเป็น cube ด้วย query บนที่เก็บ Parquet โดยตรง
+# (ไม่โหลดข้อมูลรายแถว) ตัวกรองทำบน cube ทั้งสองโหมด
+ENGINE = os.environ.get("ATTENDANCE_ENGINE", "memory")
+CACHE_BUDGET_MB = int(os.environ.get("ATTENDANCE_CACHE_MB", attendance_cache.DEFAULT_BUDGET_MB))
+
+@st.cache_resource
+def shared_cache():
+    """แคชผลลัพธ์ร่วมกันทุก session (อ็อบเจกต์เดียวทั้ง process อ่านอย่างเดียว ไม่ copy ต่อ session)"""
+    return attendance_cache.SharedDatasetCache(CACHE_BUDGET_MB * 2**20)
+
+def summarize_batch(batch):
+    """ประมวลผลชุดนำเข้าเดียว ไฟล์ part ไม่เคยถูกแก้ไข ข้อมูลใหม่จึงถูกประมวลผลเพียงครั้งเดียว
+
+    ผลของแต่ละชุดเก็บในแคชร่วมเดียวกับผลลัพธ์ทั้งชุด จึงนับรวมในงบหน่วยความจำและถูกลบได้ (LRU)
+    """
+    def build():
+        profile.cache_miss("summarize_batch")
+        return attendance_pipeline.summarize_batch(attendance_store.read_parts(part for part, *_ in batch))
+    return shared_cache().get_or_build(attendance_cache.batch_key(batch), build)
+
+def preprocess_and_calculate_summary(signature):
+    profile.cache_miss("preprocess_and_calculate_summary")
+    # ผลลัพธ์ที่ attendance_cli.py build เตรียมไว้ (ถ้าตรงกับข้อมูลปัจจุบัน) อ่านได้ทันที
+    outputs = attendance_pipeline.read_artifacts(signature)
+    if outputs is not None:
+        return outputs
+    # cube รวมยอดต่อ (ปี, เดือน, แผนก, พนักงาน) ให้ตัวกรองยุบตารางเล็กแทนการสแกนข้อมูลดิบ
+    # และดัชนีรายพนักงาน ให้การเปิดดูรายละเอียดเป็นการหยิบแถวของคนเดียว
+    return attendance_pipeline.build_outputs(
+        profile.cached_call("summarize_batch", summarize_batch, batch)
+        for batch in attendance_store.group_batches(signature)
+    )
 
-df, summary = preprocess_and_calculate_summary(df_raw)
+# สเปกกราฟ (JSON) จำไว้ต่อชุดตัวกรอง cube ไม่ถูก hash (ขึ้นกับ signature อยู่แล้ว)
+@st.cache_data(show_spinner=False, max_entries=512)
+def pie_chart_spec(signature, year, month, department, employee, _cube):
+    profile.cache_miss("pie_chart_spec")
+    frame = attendance_pipeline.filter_rows(_cube, year=year, month=month, department=department)
+    if employee is not None:
+        frame = frame[frame["ชื่อ-สกุล"] == employee]
+    totals = attendance_charts.leave_totals(frame)
+    return attendance_charts.pie_chart_spec(totals) if not totals.empty else None
+
+@st.cache_data(show_spinner=False, max_entries=512)
+def trend_chart_specs(signature, year, department, employee, _cube):
+    profile.cache_miss("trend_chart_specs")
+    frame = attendance_pipeline.filter_rows(_cube, year=year, department=department)
+    if employee is not None:
+        frame = frame[frame["ชื่อ-สกุล"] == employee]
+    trend = attendance_charts.department_trend(frame)
+    return {leave: attendance_charts.trend_chart_spec(trend, leave) for leave in attendance_charts.TREND_TYPES}
+
+# --- โหมด lazy: ไม่โหลดข้อมูลรายแถวทั้งหมด เฉพาะแถวรายละเอียดของพนักงานเป็น query บนที่เก็บ ---
+def lazy_outputs(signature):
+    """cube ทั้งหมดจากการรวมยอดทีละ batch บนที่เก็บ (ไม่มีดัชนีรายพนักงาน รายละเอียดใช้ query แทน)"""
+    profile.cache_miss("preprocess_and_calculate_summary")
+    cube = attendance_query.query_cube(STORE_PATH)
+    return attendance_pipeline.rollup_summary(cube), cube, None
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def query_employee_rows(signature, employee, leave, year=None, month=None, department=None):
+    profile.cache_miss("query_employee_rows")
+    return attendance_query.query_employee_rows(STORE_PATH, employee, leave, year, month, department)
+
+def load_outputs(signature):
+    """ผลลัพธ์ของข้อมูลเวอร์ชันนี้จากแคชร่วม (ประมวลผลเฉพาะครั้งแรก แม้หลาย session ขอพร้อมกัน)"""
+    build = lazy_outputs if ENGINE == "lazy" else preprocess_and_calculate_summary
+    outputs = shared_cache().get(signature)
+    if outputs is None:
+        with st.spinner("⚙️ กำลังประมวลผลข้อมูลและคำนวณสรุป..."):
+            outputs = shared_cache().get_or_build(signature, lambda: build(signature))
+    return outputs
+
+def drop_superseded(old_signature, new_signature):
+    """ลบผลลัพธ์ของเวอร์ชันเดิมออกจากแคชร่วม พร้อมผลย่อยของชุดนำเข้าที่ไม่อยู่ในเวอร์ชันใหม่
+
+    ชุดนำเข้าที่ยังอยู่ (ไฟล์ต้นทางที่ไม่เปลี่ยน) เก็บไว้ใช้ต่อ การประมวลผลใหม่จึงทำเฉพาะชุดที่เปลี่ยน
+    """
+    if old_signature == new_signature:
+        return
+    shared_cache().discard(old_signature)
+    current = set(attendance_store.group_batches(new_signature))
+    for batch in attendance_store.group_batches(old_signature):
+        if batch not in current:
+            shared_cache().discard(attendance_cache.batch_key(batch))
+
+# ข้อมูลเปลี่ยนตั้งแต่ rerun ก่อนของ session นี้: ปล่อยเวอร์ชันเดิมออกจากงบหน่วยความจำทันที
+previous_signature = st.session_state.get("store_signature")
+if previous_signature is not None:
+    drop_superseded(previous_signature, store_signature)
+st.session_state.store_signature = store_signature
+
+with profile.stage("preprocess") as stage:
+    summary, cube, employee_index = profile.cached_call("preprocess_and_calculate_summary", load_outputs, store_signature)
+    stage["rows_out"] = len(cube)
+
+# ตรวจไฟล์ต้นทางเป็นระยะ: rerun ทั้งหน้าเฉพาะเมื่อข้อมูลเปลี่ยนจริง
+@st.fragment(run_every=WATCH_INTERVAL_SECONDS or None)
+def watch_sources():
+    if sync_data() != store_signature:
+        st.rerun()
+
+if WATCH_INTERVAL_SECONDS:
+    watch_sources()
 
 # ----------------------------------------------------------------------------------
 # ปุ่ม Refresh และแสดงเวลา
 # ----------------------------------------------------------------------------------
 if st.button("🔄 Refresh ข้อมูล (Manual)"):
-    # ล้างแคชทั้งหมด: ทำให้ load_data และ preprocess_and_calculate_summary ทำงานใหม่
-    st.cache_data.clear() 
+    # นำเข้าเฉพาะไฟล์ต้นทางที่เปลี่ยน (mtime/ขนาด/hash) แคชของชุดนำเข้าที่ถูกแทนที่ถูกล้างตอน rerun
+    # การอ่านทุกไฟล์ใหม่ทั้งหมดใช้ `attendance_cli.py import --force`
+    sync_data()
     st.rerun()
 
 bangkok_now = datetime.datetime.now(pytz.utc).astimezone(bangkok_tz)
@@ -184,43 +285,51 @@ st.markdown(
 # ----------------------------------------------------------------------------------
 # Dashboard หลัก (การกรองข้อมูล)
 # ----------------------------------------------------------------------------------
-if not df.empty:
+if not cube.empty:
     
-    df_filtered = df.copy()
-    summary_filtered = summary.copy()
+    # ตัวกรองทั้งหมดทำงานบน cube (ไม่ต้อง copy หรือสแกนข้อมูลดิบทุกครั้งที่ rerun)
+    filters = {"year": None, "month": None, "department": None}
+    cube_filtered = cube
 
     # --- Filter (จัดเรียงใน 3 คอลัมน์) ---
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        years = ["-- แสดงทั้งหมด --"] + sorted(df["ปี"].dropna().unique(), reverse=True)
+        years = ["-- แสดงทั้งหมด --"] + sorted(cube["ปี"].unique(), reverse=True)
         selected_year = st.selectbox("📆 เลือกปี", years)
         if selected_year != "-- แสดงทั้งหมด --":
-            df_filtered = df_filtered[df_filtered["ปี"] == int(selected_year)]
+            filters["year"] = int(selected_year)
+            with profile.stage("filter_year", rows_in=len(cube_filtered)) as stage:
+                cube_filtered = attendance_pipeline.filter_rows(cube_filtered, year=filters["year"])
+                stage["rows_out"] = len(cube_filtered)
 
     with col2:
-        if "เดือน" in df_filtered.columns and not df_filtered.empty:
-            available_months = sorted(df_filtered["เดือน"].dropna().unique())
+        if not cube_filtered.empty:
+            available_months = sorted(cube_filtered["เดือน"].unique())
             month_options = ["-- แสดงทั้งหมด --"] + [format_thai_month(m) for m in available_months]
             selected_month = st.selectbox("📅 เลือกเดือน", month_options)
             if selected_month != "-- แสดงทั้งหมด --":
-                mapping = {format_thai_month(m): str(m) for m in available_months}
-                selected_period = mapping[selected_month]
-                df_filtered = df_filtered[df_filtered["เดือน"].astype(str) == selected_period]
+                mapping = {format_thai_month(m): m for m in available_months}
+                filters["month"] = mapping[selected_month]
+                with profile.stage("filter_month", rows_in=len(cube_filtered)) as stage:
+                    cube_filtered = attendance_pipeline.filter_rows(cube_filtered, month=filters["month"])
+                    stage["rows_out"] = len(cube_filtered)
 
     with col3:
-        departments = ["-- แสดงทั้งหมด --"] + sorted(df_filtered["แผนก"].dropna().unique())
+        departments = ["-- แสดงทั้งหมด --"] + sorted(cube_filtered["แผนก"].unique())
         selected_dept = st.selectbox("🏢 เลือกแผนก", departments)
         if selected_dept != "-- แสดงทั้งหมด --":
-            df_filtered = df_filtered[df_filtered["แผนก"] == selected_dept]
+            filters["department"] = selected_dept
+            with profile.stage("filter_department", rows_in=len(cube_filtered)) as stage:
+                cube_filtered = attendance_pipeline.filter_rows(cube_filtered, department=filters["department"])
+                stage["rows_out"] = len(cube_filtered)
     # -----------------------------------
 
-    # --- คำนวณ summary ใหม่อีกครั้งหลังจากการกรอง ปี/เดือน/แผนก ---
-    leave_types = ["ลาป่วย/ลากิจ", "ขาด", "สาย"]
-    if not df_filtered.empty:
-        summary_filtered = df_filtered.groupby(["ชื่อ-สกุล", "แผนก"])[leave_types].sum().reset_index()
-    else:
-        summary_filtered = pd.DataFrame(columns=["ชื่อ-สกุล", "แผนก"] + leave_types)
+    # --- ยุบ cube ที่กรองแล้วเป็นสรุปรายบุคคล ---
+    leave_types = attendance_pipeline.LEAVE_TYPES
+    with profile.stage("summary_groupby", rows_in=len(cube_filtered)) as stage:
+        summary_filtered = attendance_pipeline.rollup_summary(cube_filtered)
+        stage["rows_out"] = len(summary_filtered)
         
     # ----------------------------------------------------------------------------------
     # --- ตัวกรองพนักงาน ---
@@ -229,74 +338,56 @@ if not df.empty:
     all_names = ["-- แสดงทั้งหมด --"] + sorted(summary_filtered["ชื่อ-สกุล"].unique())
     selected_employee = st.selectbox("🔍 ค้นหาชื่อพนักงาน", all_names, key='selected_employee')
 
-    # --- สีกราฟ ---
-    colors = {
-        "ลาป่วย/ลากิจ": "#06BD1699", 
-        "ขาด": "#C40FE9", 
-        "สาย": "#0BCBEC", 
-    }
-
     # ----------------------------------------------------------------------------------
     # ส่วนที่ 2: Tabs จัดอันดับ (***ส่วนนี้คือส่วนที่แก้ไข***)
     # ----------------------------------------------------------------------------------
-    tabs = st.tabs(leave_types)
+    # คำนวณและส่งเฉพาะแท็บที่เปิดอยู่ (เปลี่ยนแท็บจะ rerun)
+    tabs = st.tabs(leave_types, key="active_tab", on_change="rerun")
     for t, leave in zip(tabs, leave_types):
-        with t:
+        if t.open is False:
+            continue
+        with t, profile.stage(f"tab {leave}", rows_in=len(summary_filtered)) as tab_stage:
             # กรองข้อมูลตามชื่อที่เลือก (ใช้ summary_filtered ที่อัปเดตแล้ว)
             if selected_employee != "-- แสดงทั้งหมด --":
                 current_summary_display = summary_filtered[summary_filtered["ชื่อ-สกุล"] == selected_employee].reset_index(drop=True)
-                person_data_full = df_filtered[df_filtered["ชื่อ-สกุล"] == selected_employee].reset_index(drop=True)
             else:
                 current_summary_display = summary_filtered.reset_index(drop=True)
-                person_data_full = df_filtered.reset_index(drop=True)
 
             # --- แสดงข้อมูลสรุป ---
             st.markdown("### 📌 สรุปข้อมูลรายบุคคล")
-            st.dataframe(current_summary_display, use_container_width=True, hide_index=True)
+            offset, page_size = page_controls(len(current_summary_display), f"summary|{leave}")
+            st.dataframe(current_summary_display.iloc[offset:offset + page_size], use_container_width=True, hide_index=True)
 
 
             # --- แสดงรายละเอียดวันลา (เมื่อเลือกพนักงาน) ---
-            if selected_employee != "-- แสดงทั้งหมด --" and not person_data_full.empty:
-                if leave == "ลาป่วย/ลากิจ":
-                    relevant_exceptions = ["ลาป่วย", "ลากิจ", "ลาป่วยครึ่งวัน", "ลากิจครึ่งวัน"]
-                elif leave == "ขาด":
-                    relevant_exceptions = ["ขาด", "ขาดครึ่งวัน"]
-                else: # สาย
-                    relevant_exceptions = [leave]
-
-                dates = person_data_full.loc[
-                    person_data_full["ข้อยกเว้น"].isin(relevant_exceptions), ["วันที่", "เวลาเข้า", "เวลาออก", "ข้อยกเว้น"]
-                ].sort_values(by="วันที่", ascending=False)
+            if selected_employee != "-- แสดงทั้งหมด --":
+                # แถวจากดัชนีถูกแยกตามประเภทและเรียงวันที่ล่าสุดก่อนไว้แล้ว เหลือแค่กรอง ปี/เดือน/แผนก
+                if ENGINE == "lazy":
+                    rows = profile.cached_call(
+                        "query_employee_rows", query_employee_rows,
+                        store_signature, selected_employee, leave, *filters.values(),
+                    )
+                else:
+                    rows = attendance_pipeline.filter_rows(
+                        attendance_pipeline.employee_rows(employee_index, selected_employee, leave), **filters
+                    )
+                dates = rows[["วันที่", "เวลาเข้า", "เวลาออก", "ข้อยกเว้น", leave]]
                 
-                # คำนวณยอดรวมวันลา/ขาด/สาย
-                total_days = dates.apply(lambda row: 0.5 if "ครึ่งวัน" in str(row['ข้อยกเว้น']) else 1, axis=1).sum()
-                if leave == "สาย":
-                    total_count = dates.shape[0]
+                # คำนวณยอดรวมวันลา/ขาด/สาย (คอลัมน์น้ำหนักคำนวณไว้แล้วตอนประมวลผล)
+                total_days = dates[leave].sum()
+                total_count = dates.shape[0]
 
                 if not dates.empty:
                     with st.expander(f"ดูรายละเอียดวันที่ ({leave})"):
-                        
-                        for _, row in dates.iterrows():
-                            # การจัดการวันที่และเวลา
-                            date_str = row['วันที่'].strftime('%d/%m/%Y')
-                            exception_text = row['ข้อยกเว้น']
-
-                            entry_time_raw = row['เวลาเข้า']
-                            exit_time_raw = row['เวลาออก']
-                            
-                            if exception_text in ["ลาป่วย", "ลากิจ", "ขาด"]:
-                                time_period = '00:00 - 00:00'
-                            else:
-                                entry_time = entry_time_raw.strftime('%H:%M') if entry_time_raw is not None else '00:00'
-                                exit_time = exit_time_raw.strftime('%H:%M') if exit_time_raw is not None else '00:00'
-                                time_period = f"{entry_time} - {exit_time}"
-                            
-                            label = (
-                                f"<div style='margin-bottom: 5px; font-size: 16px;'>"
-                                f"• {date_str}&nbsp;&nbsp;&nbsp;&nbsp;{time_period}&nbsp;&nbsp;&nbsp;&nbsp;{exception_text}"
-                                f"</div>"
-                            )
-                            st.markdown(label, unsafe_allow_html=True)
+                        # แสดงทีละหน้า: สร้าง HTML ทั้งหน้าในครั้งเดียวแล้วส่งเป็น element เดียว
+                        limit_key = f"detail_limit|{selected_employee}|{leave}"
+                        limit = st.session_state.get(limit_key, DETAIL_PAGE_SIZE)
+                        st.markdown(format_detail_rows(dates.head(limit)), unsafe_allow_html=True)
+
+                        if total_count > limit:
+                            if st.button(f"แสดงเพิ่มเติม ({limit:,} จาก {total_count:,} รายการ)", key=f"more|{limit_key}"):
+                                st.session_state[limit_key] = limit + DETAIL_PAGE_SIZE
+                                st.rerun()
                             
                         st.markdown("<hr>", unsafe_allow_html=True)
                         
@@ -305,89 +396,74 @@ if not df.empty:
                         else:
                             st.markdown(f"<div style='font-weight: bold; font-size: 16px; margin-top: 10px;'>ยอดรวม: {total_days:.0f} วัน</div>", unsafe_allow_html=True)
 
-            # --- ตารางอันดับ ---
-            ranking = current_summary_display[["ชื่อ-สกุล", "แผนก", leave]].sort_values(by=leave, ascending=False).reset_index(drop=True)
-            ranking.insert(0, "อันดับ", range(1, len(ranking) + 1))
-            
-            if not ranking.empty:
-                ranking = ranking.iloc[:-1]
-                
+            # --- ตารางอันดับ (เลือกเฉพาะอันดับในหน้าที่แสดง ไม่เรียงทั้งตาราง) ---
             # ย้าย subheader มาไว้ตรงนี้ตามที่ต้องการ
             st.subheader(f"🏆 จัดอันดับ {leave}")
+            offset, page_size = page_controls(attendance_pipeline.ranking_size(current_summary_display), f"ranking|{leave}")
+            ranking = attendance_pipeline.build_ranking(current_summary_display, leave, top_n=page_size, offset=offset)
             st.dataframe(ranking, use_container_width=True, hide_index=True)
+            tab_stage["rows_out"] = len(ranking)
 
     # ----------------------------------------------------------------------------------
     # Pie Chart
     # ----------------------------------------------------------------------------------
     st.markdown("---")
     
-    # --- 1. เตรียมข้อมูลสำหรับ Pie Chart โดยอิงตามตัวกรองทั้งหมด ---
-    data_for_pie_chart = summary_filtered.copy()
     pie_chart_title = "สัดส่วนภาพรวม Pie Chart" # หัวข้อเริ่มต้น
-
-    # ถ้ามีการเลือกพนักงาน ให้กรองข้อมูลและเปลี่ยนหัวข้อ
+    chart_employee = None
     if selected_employee != "-- แสดงทั้งหมด --":
-        data_for_pie_chart = data_for_pie_chart[data_for_pie_chart["ชื่อ-สกุล"] == selected_employee]
+        chart_employee = selected_employee
         pie_chart_title = f"สัดส่วนของ: {selected_employee}"
 
     st.subheader(f"🥧 {pie_chart_title}")
-    
-    # --- 2. คำนวณยอดรวมจากข้อมูลที่กรองแล้ว ---
-    total_summary = data_for_pie_chart[leave_types].sum().reset_index()
-    total_summary.columns = ['ประเภท', 'ยอดรวม']
-    total_summary = total_summary[total_summary['ยอดรวม'] > 0].reset_index(drop=True)
-
-    # --- 3. สร้างกราฟ (เหมือนเดิม) ---
-    if total_summary['ยอดรวม'].sum() > 0:
-        total = total_summary['ยอดรวม'].sum()
-        total_summary['Percentage'] = (total_summary['ยอดรวม'] / total * 100).round(1)
-        total_summary['label'] = total_summary.apply(lambda x: f"{x['ประเภท']} ({x['Percentage']}%)", axis=1)
-
-        base = alt.Chart(total_summary).encode(
-            theta=alt.Theta("ยอดรวม", stack=True),
-            color=alt.Color(
-                "ประเภท",
-                scale=alt.Scale(domain=list(colors.keys()), range=list(colors.values()))
-            ),
-            order=alt.Order("ยอดรวม", sort="descending"), 
-            tooltip=[
-                "ประเภท",
-                alt.Tooltip("ยอดรวม", format=".1f", title="จำนวน (วัน/ครั้ง)"),
-                alt.Tooltip("Percentage", format=".1f", title="เปอร์เซ็นต์ (%)")
-            ]
+    with profile.stage("pie_chart", rows_in=len(cube_filtered)):
+        pie_spec = profile.cached_call(
+            "pie_chart_spec", pie_chart_spec,
+            store_signature, filters["year"], filters["month"], filters["department"], chart_employee, cube,
         )
+        if pie_spec is not None:
+            st.vega_lite_chart(pie_spec, use_container_width=True)
+        else:
+            st.info("ไม่พบข้อมูลเพื่อแสดงในแผนภูมิวงกลม ตามตัวกรองที่เลือก")
 
-        pie = base.mark_arc(outerRadius=130, innerRadius=60)
-
-        text_labels = base.mark_text(
-            radius= 230,
-            size=20, 
-            fontWeight="bold",
-        ).encode(
-            text=alt.Text('label:N'),
-            color=alt.Color('ประเภท:N', scale=alt.Scale(domain=list(colors.keys()), range=list(colors.values()))),
-            tooltip=alt.value(None)
+    # ----------------------------------------------------------------------------------
+    # แนวโน้มรายเดือนต่อแผนก (ตามปี/แผนก/พนักงานที่เลือก ไม่กรองเดือน)
+    # ----------------------------------------------------------------------------------
+    st.subheader("📈 แนวโน้มรายเดือน สาย / ขาด ต่อแผนก")
+    with profile.stage("trend_charts", rows_in=len(cube)):
+        trend_specs = profile.cached_call(
+            "trend_chart_specs", trend_chart_specs,
+            store_signature, filters["year"], filters["department"], chart_employee, cube,
         )
+        for col, (leave, spec) in zip(st.columns(len(trend_specs)), trend_specs.items()):
+            with col:
+                st.markdown(f"**{leave}**")
+                st.vega_lite_chart(spec, use_container_width=True)
 
-        center_text_val = "100%" if total > 0 else "0%"
-        center_text = alt.Chart(pd.DataFrame({'text': [f"รวม {center_text_val}"]})).mark_text(
-            size=20, color='black', fontWeight='bold'
-        ).encode(text='text:N')
+else:
+    st.info("กรุณาตรวจสอบว่ามีไฟล์ attendances.xlsx อยู่ในโฟลเดอร์เดียวกับโปรแกรม")
 
-        chart = pie + text_labels + center_text
-        
-        chart = chart.properties(
-            width=500,
-            height=500
-        ).configure_legend(
-            titleFontSize=14,
-            labelFontSize=12
+# ----------------------------------------------------------------------------------
+# ผลการจับเวลา (แถบข้างสำหรับผู้ดูแล: ATTENDANCE_ADMIN=1 หรือ ?admin=1)
+# ----------------------------------------------------------------------------------
+profile.context = {"rows": len(cube), "filters": {} if cube.empty else {k: v for k, v in filters.items() if v is not None}}
+
+if show_admin_panel:
+    with st.sidebar:
+        st.markdown("### ⏱️ เวลาแต่ละขั้น (rerun นี้)")
+        st.dataframe(profile.stage_frame(), use_container_width=True, hide_index=True)
+        st.markdown("### 🗄️ Cache hit / miss")
+        st.dataframe(profile.cache_frame(), use_container_width=True, hide_index=True)
+        st.markdown("### 💾 แคชข้อมูลร่วม")
+        st.dataframe(shared_cache().report(), use_container_width=True, hide_index=True)
+        st.caption(
+            f"{shared_cache().total_bytes() / 2**20:,.1f} / {CACHE_BUDGET_MB:,} MB · "
+            f"{len(shared_cache())} รายการ · ลบออกแล้ว {shared_cache().evictions} ครั้ง"
         )
+        st.caption(f"รวม {profile.total_seconds():.3f} วินาที · log: {PROFILE_LOG_PATH or '(ปิด)'}")
 
-        st.altair_chart(chart, use_container_width=True)
-
-    else:
-        st.info("ไม่พบข้อมูลเพื่อแสดงในแผนภูมิวงกลม ตามตัวกรองที่เลือก")
-
-else:
-    st.info("กรุณาตรวจสอบว่ามีไฟล์ attendances.xlsx อยู่ในโฟลเดอร์เดียวกับโปรแกรม")
\ No newline at end of file
+if PROFILE_LOG_PATH:
+    try:
+        profile.write_log(PROFILE_LOG_PATH, max_bytes=int(PROFILE_LOG_MAX_MB * 2**20))
+    except OSError:
+        pass  # การบันทึก log ไม่ควรทำให้แดชบอร์ดใช้งานไม่ได้